@@ -0,0 +1,127 @@
+# ===============================
+# Almacén binario de chunks para el sistema RAG
+# ===============================
+# Sustituye la lista "chunks" de rag_metadata.json por dos archivos:
+# - <base>.bin: el texto de todos los chunks, codificado en UTF-8 y concatenado.
+# - <base>.npy: un registro por chunk con su posición en el .bin (inicio, fin), el documento y la página de origen.
+# Ambos se abren con memory-map: cada worker de Waitress (o proceso) comparte las mismas páginas del sistema
+# operativo en lugar de tener su propia copia del texto, y sólo se decodifican los chunks que se recuperan.
+# Un chunk eliminado (documento = -1) se lee como None, igual que en la lista de metadatos.
+# <base>.gen guarda la generación (id de la construcción del índice) a la que corresponde el almacén,
+# la misma que se guarda en los metadatos, para que el chat detecte un conjunto de archivos a medio reemplazar.
+
+# Importo las librerías necesarias
+import os
+import mmap
+import numpy as np
+
+# Un registro por chunk: bytes [inicio, fin) del .bin, índice del documento (-1 = eliminado) y página (1..n)
+TIPO_REGISTRO = np.dtype([("inicio", "<i8"), ("fin", "<i8"), ("documento", "<i4"), ("pagina", "<i4")])
+
+
+class AlmacenChunks:
+    def __init__(self, ruta_base, documentos):
+        # documentos: nombres de los documentos, en el orden de los índices guardados en cada registro
+        self.ruta_base = ruta_base
+        self.documentos = list(documentos)
+        self._registros = np.load(f"{ruta_base}.npy", mmap_mode="r")
+        with open(f"{ruta_base}.bin", "rb") as f:
+            # mmap no admite archivos vacíos (índice sin chunks)
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        # Se lee después de los registros: la generación se reemplaza antes que ellos al escribir
+        self.generacion = leer_generacion(ruta_base)
+
+    def __len__(self):
+        return len(self._registros)
+
+    def __getitem__(self, i):
+        """Texto del chunk i (o None si su documento se eliminó); sólo se lee y decodifica ese tramo del .bin"""
+        inicio, fin, documento, _ = self._registros[i]
+        if documento < 0:
+            return None
+        return self._blob[inicio:fin].decode("utf-8")
+
+    def fuente(self, i):
+        """(documento, página) de origen del chunk i, o None si se eliminó"""
+        _, _, documento, pagina = self._registros[i]
+        if documento < 0:
+            return None
+        return self.documentos[documento], int(pagina)
+
+    def eliminados(self):
+        return int(np.count_nonzero(self._registros["documento"] < 0))
+
+
+def leer_generacion(ruta_base):
+    """Generación guardada junto al almacén, o None si no tiene (almacenes anteriores)"""
+    try:
+        with open(f"{ruta_base}.gen", "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def escribir_generacion(ruta_base, generacion, reemplazos=None):
+    """
+    Escribe la generación del almacén. Debe reemplazarse antes que el índice y el almacén (y leerse después):
+    así un lector que vea cualquier archivo nuevo ve también la generación nueva, distinta a la de unos metadatos antiguos
+    """
+    with open(f"{ruta_base}.gen.tmp", "w", encoding="utf-8") as f:
+        f.write(generacion)
+    if reemplazos is None:
+        os.replace(f"{ruta_base}.gen.tmp", f"{ruta_base}.gen")
+    else:
+        reemplazos.append((f"{ruta_base}.gen.tmp", f"{ruta_base}.gen"))
+
+
+def escribir_almacen(ruta_base, textos, fuentes, documentos, eliminar=(), anexar=False, reemplazos=None):
+    """
+    Escribe el almacén de chunks. fuentes es una lista de (nombre_documento, página) por texto y
+    documentos la lista de nombres (se le agregan los que falten; se devuelve actualizada).
+    Con anexar=True los textos nuevos se agregan al final del .bin existente y los ids de 'eliminar'
+    se marcan como borrados; los chunks ya escritos conservan su posición (la misma que en el índice FAISS).
+    Los archivos se escriben a temporales; si se pasa la lista reemplazos, los pares (temporal, destino)
+    se agregan a ella para que quien llama haga los os.replace junto con los del índice, en su orden
+    """
+    documentos = list(documentos)
+    posicion_documento = {nombre: i for i, nombre in enumerate(documentos)}
+    for nombre, _ in fuentes:
+        if nombre not in posicion_documento:
+            posicion_documento[nombre] = len(documentos)
+            documentos.append(nombre)
+
+    codificados = [texto.encode("utf-8") for texto in textos]
+    nuevos = np.zeros(len(codificados), dtype=TIPO_REGISTRO)
+    longitudes = np.fromiter((len(c) for c in codificados), dtype=np.int64, count=len(codificados))
+    nuevos["documento"] = [posicion_documento[nombre] for nombre, _ in fuentes]
+    nuevos["pagina"] = [pagina for _, pagina in fuentes]
+
+    if anexar:
+        registros = np.load(f"{ruta_base}.npy") # Copia en memoria (el archivo puede estar mapeado por el chat)
+        registros["documento"][list(eliminar)] = -1
+        desplazamiento = os.path.getsize(f"{ruta_base}.bin")
+        # Primero se anexa el texto y después se reemplazan los registros: un lector que abra
+        # el almacén entre medias ve los registros antiguos, que siguen apuntando a bytes válidos
+        with open(f"{ruta_base}.bin", "ab") as f:
+            f.write(b"".join(codificados))
+    pendientes = []
+    if not anexar:
+        registros = np.zeros(0, dtype=TIPO_REGISTRO)
+        desplazamiento = 0
+        with open(f"{ruta_base}.bin.tmp", "wb") as f:
+            f.write(b"".join(codificados))
+        pendientes.append((f"{ruta_base}.bin.tmp", f"{ruta_base}.bin"))
+
+    nuevos["fin"] = desplazamiento + np.cumsum(longitudes)
+    nuevos["inicio"] = nuevos["fin"] - longitudes
+    registros = np.concatenate([registros, nuevos])
+    with open(f"{ruta_base}.npy.tmp", "wb") as f:
+        np.save(f, registros)
+    pendientes.append((f"{ruta_base}.npy.tmp", f"{ruta_base}.npy"))
+
+    if reemplazos is None:
+        for temporal, destino in pendientes:
+            os.replace(temporal, destino)
+    else:
+        reemplazos.extend(pendientes)
+    return documentos
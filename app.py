@@ -1,14 +1,28 @@
 import os
+import json
+import time
 import logging
-from flask import Flask, request, jsonify, render_template
+import threading
+import functools
+_inicio_importacion = time.perf_counter() # Para medir cuánto tarda en importarse la app (arranque de cada worker)
+from types import SimpleNamespace
+from concurrent.futures import TimeoutError as TiempoAgotado
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 from flask_cors import CORS
 import joblib
-import pandas as pd
 from preprocessing import PreprocessingTransformer
 from feature_selector import FeatureSelector
-from onehot_transformer import OneHotEncoderTransformer
+from onehot_transformer import OneHotEncoderTransformer, pipeline_disperso
 from manual_scaler import ManualScaler
+import chat_rag_local
 from chat_rag_local import responder_pregunta
+from inferencia import (variables_requeridas, validar_registro, predecir_lote, inferir_registro, clave_registro,
+                        UMBRAL_DECISION)
+from plan_fila import PlanFila
+from cache_lru import CacheLRU
+from carga_perezosa import CargaPerezosa
+from concurrencia import LimiteConcurrencia, EjecutorAcotado, Saturado
+import metricas
 import traceback
 
 # --- Configuración de logging ---
@@ -24,21 +38,147 @@ app = Flask(__name__)
 CORS(app)  # Habilitar CORS para permitir peticiones desde otros dominios (útil para frontend externo)
 
 # --- Cargo el pipeline entrenado ---
-# Se carga el modelo/pipeline completo previamente entrenado con joblib
-modelo = joblib.load("pipeline_modelo_completo.pkl")
-
-# --- Variables numéricas y requeridas ---
-# Se definen los nombres de las variables que deben ser numéricas
-numeric_vars = {
-    "age", "duration", "campaign", "pdays", "previous",
-    "emp.var.rate", "cons.price.idx", "cons.conf.idx", "euribor3m", "nr.employed"
-}
-# Conjunto de variables que se esperan obligatoriamente para hacer la predicción
-variables_requeridas = {
-    "age", "job", "marital", "education", "default", "housing", "loan", "contact",
-    "month", "day_of_week", "duration", "campaign", "pdays", "previous", "poutcome",
-    "emp.var.rate", "cons.price.idx", "cons.conf.idx", "euribor3m", "nr.employed"
-}
+# Se carga el modelo/pipeline completo previamente entrenado con joblib, en la primera petición que lo necesita
+MODELO_PATH = "pipeline_modelo_completo.pkl"
+
+def _firma_modelo():
+    """Identifica la versión del archivo del modelo (fecha de modificación y tamaño)"""
+    estado = os.stat(MODELO_PATH)
+    return (estado.st_mtime_ns, estado.st_size)
+
+def cargar_modelo():
+    """Carga el pipeline y prepara sus variantes: el plan de fila para /predict y el pipeline para /predict_batch"""
+    firma = _firma_modelo()
+    nuevo_modelo = joblib.load(MODELO_PATH)
+
+    # Plan compilado a partir del pipeline que puntúa un registro sin construir DataFrames (desactivable con PLAN_FILA=0)
+    nuevo_plan = None
+    if os.environ.get("PLAN_FILA", "1") == "1":
+        try:
+            nuevo_plan = PlanFila(nuevo_modelo)
+        except Exception as e:
+            logger.warning(f"No se pudo compilar el plan de fila, /predict usará el pipeline de pandas: {e}")
+
+    # Pipeline para /predict_batch: con PREDICT_BATCH_DISPERSO=1 el one-hot se mantiene como matriz CSR
+    # de punta a punta. Si el modelo no lo admite (p. ej. el estimador final no acepta matrices dispersas)
+    # se usa el pipeline denso, en lugar de que cada lote falle
+    nuevo_lote = nuevo_modelo
+    if os.environ.get("PREDICT_BATCH_DISPERSO", "0") == "1":
+        try:
+            nuevo_lote = pipeline_disperso(nuevo_modelo)
+        except Exception as e:
+            logger.warning(f"No se pudo usar el modo disperso, /predict_batch usará el pipeline denso: {e}")
+
+    return SimpleNamespace(modelo=nuevo_modelo, plan_fila=nuevo_plan, modelo_lote=nuevo_lote, firma=firma)
+
+modelo_predictivo = CargaPerezosa("modelo", cargar_modelo)
+
+# --- Caché de predicciones ---
+# Caché de /predict con clave en el registro validado: tamaño máximo (PREDICT_CACHE_MAX, 0 la desactiva)
+# y vida de cada entrada en segundos (PREDICT_CACHE_TTL, 0 = sin expiración)
+_ttl_cache = float(os.environ.get("PREDICT_CACHE_TTL", 300))
+cache_predicciones = CacheLRU(int(os.environ.get("PREDICT_CACHE_MAX", 10000)), ttl=_ttl_cache or None)
+# Cada cuántos segundos se comprueba si el archivo del modelo cambió
+MODELO_VERIFICACION_SEG = float(os.environ.get("MODELO_VERIFICACION_SEG", 5))
+_ultima_verificacion = time.monotonic()
+_lock_modelo = threading.Lock()
+
+def verificar_modelo():
+    """
+    Devuelve el modelo cargado (cargándolo en la primera llamada). Si el archivo del modelo cambió,
+    lo recarga e invalida la caché de predicciones
+    """
+    global _ultima_verificacion
+    if not modelo_predictivo.cargado or time.monotonic() - _ultima_verificacion < MODELO_VERIFICACION_SEG:
+        return modelo_predictivo.obtener()
+    with _lock_modelo:
+        if time.monotonic() - _ultima_verificacion < MODELO_VERIFICACION_SEG:
+            return modelo_predictivo.obtener() # Otro hilo acaba de hacer la comprobación
+        _ultima_verificacion = time.monotonic()
+        try:
+            cambio = _firma_modelo() != modelo_predictivo.obtener().firma
+        except OSError:
+            return modelo_predictivo.obtener() # Archivo reemplazándose en este momento: se sigue con el modelo cargado
+        if cambio:
+            logger.info("El archivo del modelo cambió: se recarga el pipeline y se invalida la caché de predicciones")
+            modelo_predictivo.recargar()
+            cache_predicciones.invalidar()
+        return modelo_predictivo.obtener()
+
+# Cantidad máxima de registros aceptados en una sola petición a /predict_batch
+PREDICT_BATCH_MAX = int(os.environ.get("PREDICT_BATCH_MAX", 10000))
+
+# --- Precarga de modelos ---
+# Subsistemas que se cargan de forma perezosa. PRECARGA indica cuáles cargar en segundo plano al arrancar
+# (p. ej. "modelo", "rag" o "modelo,rag"; "todo" = todos); /readyz responde 503 hasta que terminen.
+# Sin PRECARGA cada subsistema se carga en la primera petición que lo usa
+SUBSISTEMAS = {"modelo": modelo_predictivo, **chat_rag_local.SUBSISTEMAS}
+
+def _subsistemas_precarga(valor):
+    nombres = []
+    for nombre in (n.strip() for n in valor.split(",") if n.strip()):
+        if nombre == "todo":
+            nombres.extend(SUBSISTEMAS)
+        elif nombre == "rag":
+            nombres.extend(chat_rag_local.SUBSISTEMAS)
+        elif nombre in SUBSISTEMAS:
+            nombres.append(nombre)
+        else:
+            logger.warning(f"Subsistema desconocido en PRECARGA: {nombre}")
+    return list(dict.fromkeys(nombres))
+
+PRECARGA = _subsistemas_precarga(os.environ.get("PRECARGA", ""))
+for _nombre in PRECARGA:
+    SUBSISTEMAS[_nombre].precargar()
+
+# --- Límites de concurrencia por ruta ---
+# Las preguntas RAG se ejecutan en un pool dedicado de RAG_TRABAJADORES hilos con hasta RAG_MAX_COLA preguntas
+# esperando; por encima de eso /rag_chat responde 429 en lugar de ocupar más hilos de Waitress, así las
+# predicciones siempre encuentran hilos libres. /predict y /predict_batch pueden limitarse también
+# (0 = sin límite). Waitress debe tener más hilos (WAITRESS_THREADS) que peticiones RAG admitidas
+RAG_TRABAJADORES = int(os.environ.get("RAG_TRABAJADORES", 8))
+RAG_MAX_COLA = int(os.environ.get("RAG_MAX_COLA", 8))
+RAG_TIMEOUT_SEG = float(os.environ.get("RAG_TIMEOUT_SEG", 60))
+RAG_SSE_LATIDO_SEG = float(os.environ.get("RAG_SSE_LATIDO_SEG", 5)) # Comentario SSE periódico mientras se espera
+ejecutor_rag = EjecutorAcotado("rag", RAG_TRABAJADORES, RAG_MAX_COLA)
+limite_predict = LimiteConcurrencia(int(os.environ.get("PREDICT_MAX_CONCURRENCIA", 0)))
+limite_predict_batch = LimiteConcurrencia(int(os.environ.get("PREDICT_BATCH_MAX_CONCURRENCIA", 2)))
+
+def _saturado(mensaje):
+    """Respuesta 429 con Retry-After para que el cliente reintente más tarde"""
+    respuesta = jsonify({"error": mensaje})
+    respuesta.status_code = 429
+    respuesta.headers["Retry-After"] = "1"
+    return respuesta
+
+def limitar(limite, mensaje):
+    """Decorador: rechaza con 429 las peticiones que superan el límite de concurrencia de la ruta"""
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not limite.intentar():
+                return _saturado(mensaje)
+            try:
+                return vista(*args, **kwargs)
+            finally:
+                limite.liberar()
+        return envoltura
+    return decorador
+
+# --- Métricas por ruta ---
+# Cantidad de peticiones por ruta y código de respuesta, y su duración, para /metrics
+@app.before_request
+def _inicio_peticion():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def _registrar_peticion(respuesta):
+    ruta = request.url_rule.rule if request.url_rule is not None else "desconocida"
+    metricas.peticiones.incrementar(ruta=ruta, codigo=respuesta.status_code)
+    if "inicio_peticion" in g:
+        # En /rag_chat con SSE mide hasta que empieza el stream, no hasta el último evento
+        metricas.duracion_peticiones.observar(time.perf_counter() - g.inicio_peticion, ruta=ruta)
+    return respuesta
 
 # --- Rutas de la aplicación Flask ---
 @app.route('/')
@@ -47,42 +187,38 @@ def home():
     return render_template("chat.html")
 
 @app.route('/predict', methods=['POST'])
+@limitar(limite_predict, "Demasiadas predicciones simultáneas, intente de nuevo en unos segundos.")
 def predict():
     # Recibe los datos enviados en formato JSON desde el frontend
     datos_usuario = request.json or {}
-    # Verifica que se haya enviado un JSON válido
-    if not datos_usuario:
-        return jsonify({"error": "No se enviaron datos JSON válidos."}), 400
-
-    # Verifica si faltan variables obligatorias
-    faltantes = variables_requeridas - datos_usuario.keys()
-    if faltantes:
-        return jsonify({"error": f"Faltan variables obligatorias: {', '.join(sorted(faltantes))}"}), 400
+    # Valida el registro (JSON no vacío, variables obligatorias y conversión numérica a float)
+    datos_usuario, error = validar_registro(datos_usuario)
+    if error:
+        return jsonify({"error": error}), 400
 
     # Detecta si se enviaron variables extra no reconocidas
     extra = datos_usuario.keys() - variables_requeridas
     if extra:
         logger.warning(f"Se enviaron variables extra: {extra}")
 
-    # Convierte las variables numéricas a float
-    for var in numeric_vars:
-        if var in datos_usuario:
-            try:
-                datos_usuario[var] = float(datos_usuario[var])
-            except ValueError:
-                return jsonify({"error": f"La variable '{var}' debe ser numérica."}), 400
-
     try:
-        # Crea un DataFrame con los datos del usuario para pasarlos al pipeline
-        df = pd.DataFrame([datos_usuario])
-        logger.info(f"Predicción recibida con columnas: {df.columns.tolist()}")
-        # Realiza la predicción y obtiene la probabilidad de la clase positiva
-        prediccion = int(modelo.predict(df)[0])
-        probabilidad = float(modelo.predict_proba(df)[0][1])
-        # Devuelve la predicción y la probabilidad al frontend
+        logger.debug("Predicción recibida con columnas: %s", list(datos_usuario))
+        cargado = verificar_modelo()
+        # Los perfiles repetidos se responden desde la caché, sin recorrer el pipeline.
+        # La clave incluye la versión del modelo para no mezclar resultados de modelos distintos
+        clave = (cargado.firma, clave_registro(datos_usuario))
+        resultado = cache_predicciones.obtener(clave)
+        if resultado is None:
+            # Ejecuta el pipeline una sola vez (con el plan de fila si está disponible):
+            # la clase se deriva de la probabilidad y del umbral de decisión
+            resultado = inferir_registro(cargado.modelo, datos_usuario, cargado.plan_fila)
+            cache_predicciones.guardar(clave, resultado)
+        prediccion, probabilidad = resultado
+        # Devuelve la predicción, la probabilidad y el umbral aplicado al frontend
         return jsonify({
             "prediccion": prediccion,
-            "probabilidad": round(probabilidad, 4)
+            "probabilidad": round(probabilidad, 4),
+            "umbral": UMBRAL_DECISION
         })
 
     except Exception:
@@ -90,6 +226,98 @@ def predict():
         logger.error("Error en predicción:\n" + traceback.format_exc())
         return jsonify({"error": "Error al procesar la predicción. Verifique los datos enviados."}), 500
 
+@app.route('/predict_batch', methods=['POST'])
+@limitar(limite_predict_batch, "Demasiados lotes simultáneos, intente de nuevo en unos segundos.")
+def predict_batch():
+    # Acepta un array JSON, un objeto {"registros": [...]} o un cuerpo NDJSON (un registro por línea)
+    registros = _leer_registros_lote()
+    if registros is None:
+        return jsonify({"error": "Se esperaba un array JSON, un objeto con 'registros' o un cuerpo NDJSON."}), 400
+    if not registros:
+        return jsonify({"error": "No se enviaron registros."}), 400
+    if len(registros) > PREDICT_BATCH_MAX:
+        return jsonify({"error": f"El lote supera el máximo de {PREDICT_BATCH_MAX} registros."}), 413
+
+    try:
+        cargado = verificar_modelo()
+        # Valida todos los registros y puntúa los válidos con una única pasada por el pipeline
+        inicio = time.perf_counter()
+        resultados = predecir_lote(cargado.modelo_lote, registros)
+        segundos = time.perf_counter() - inicio
+    except Exception:
+        logger.error("Error en predicción por lotes:\n" + traceback.format_exc())
+        return jsonify({"error": "Error al procesar el lote de predicciones."}), 500
+
+    errores = sum(1 for r in resultados if "error" in r)
+    logger.info(f"Lote de {len(registros)} registros puntuado en {segundos:.3f}s ({errores} con error)")
+    # Devuelve los resultados por registro junto con el rendimiento medido en filas por segundo
+    return jsonify({
+        "resultados": resultados,
+        "umbral": UMBRAL_DECISION,
+        "total": len(registros),
+        "validos": len(registros) - errores,
+        "errores": errores,
+        "segundos": round(segundos, 4),
+        "filas_por_segundo": round(len(registros) / segundos, 1) if segundos > 0 else None
+    })
+
+def _leer_registros_lote():
+    """Obtiene la lista de registros del cuerpo de la petición (JSON o NDJSON). Devuelve None si el formato no es válido"""
+    if request.mimetype in ("application/x-ndjson", "application/jsonlines"):
+        registros = []
+        for linea in request.get_data(as_text=True).splitlines():
+            if not linea.strip():
+                continue
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                # La línea inválida se reporta como error de ese registro, sin invalidar el lote completo
+                registros.append(None)
+        return registros
+
+    cuerpo = request.get_json(silent=True)
+    if isinstance(cuerpo, dict):
+        cuerpo = cuerpo.get("registros")
+    return cuerpo if isinstance(cuerpo, list) else None
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    # Estadísticas de las cachés (predicciones y RAG) y versión del modelo cargado, para los operadores
+    # (null si el subsistema todavía no se cargó)
+    firma = modelo_predictivo.obtener().firma if modelo_predictivo.cargado else None
+    return jsonify({
+        "predicciones": cache_predicciones.estadisticas(),
+        "rag": chat_rag_local.estadisticas_cache(),
+        "modelo": {"archivo": MODELO_PATH, "mtime_ns": firma[0], "bytes": firma[1]} if firma else None
+    })
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: el proceso responde (no depende de que los modelos estén cargados)
+    return jsonify({
+        "estado": "ok",
+        "segundos_activo": round(time.perf_counter() - _inicio_importacion, 1),
+        "segundos_importacion": round(SEGUNDOS_IMPORTACION, 3)
+    })
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: estado de carga de cada subsistema; 503 mientras los de PRECARGA no estén listos
+    estados = {nombre: carga.estado() for nombre, carga in SUBSISTEMAS.items()}
+    listo = all(estados[nombre]["cargado"] for nombre in PRECARGA)
+    concurrencia = {
+        "rag": ejecutor_rag.estadisticas(),
+        "predict": limite_predict.estadisticas(),
+        "predict_batch": limite_predict_batch.estadisticas(),
+    }
+    return jsonify({"listo": listo, "precarga": PRECARGA, "subsistemas": estados,
+                    "concurrencia": concurrencia}), 200 if listo else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Histogramas de latencia por etapa del pipeline y del RAG y contadores de peticiones (formato Prometheus)
+    return Response(metricas.exponer(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/rag_chat', methods=['POST'])
 def rag_chat():
     # Recibe la pregunta enviada desde el frontend para el sistema RAG
@@ -98,16 +326,70 @@ def rag_chat():
         return jsonify({"error": "No se recibió una pregunta válida."}), 400
 
     try:
-        # Llama a la función de RAG que genera la respuesta basada en los documentos indexados
-        respuesta = responder_pregunta(pregunta)
+        # Encola la pregunta en el pool dedicado del RAG (429 si está saturado)
+        futuro = ejecutor_rag.enviar(responder_pregunta, pregunta)
+    except Saturado:
+        return _saturado("El asistente está atendiendo demasiadas preguntas, intente de nuevo en unos segundos.")
+
+    # Con ?stream=1 o Accept: text/event-stream la respuesta se envía como server-sent events
+    if request.args.get("stream") == "1" or request.accept_mimetypes.best == "text/event-stream":
+        return Response(
+            stream_with_context(_eventos_rag(pregunta, futuro)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        # Espera la respuesta de la función de RAG basada en los documentos indexados
+        respuesta = futuro.result(timeout=RAG_TIMEOUT_SEG)
         return jsonify({"pregunta": pregunta, "respuesta": respuesta})
+    except TiempoAgotado:
+        futuro.cancel() # Si todavía no empezó, se descarta
+        return jsonify({"error": "La pregunta tardó demasiado en procesarse."}), 504
     except Exception:
         # Captura errores en el procesamiento RAG
         logger.error("Error en RAG:\n" + traceback.format_exc())
         return jsonify({"error": "Ocurrió un error interno al procesar la pregunta."}), 500
 
+def _evento(nombre, datos):
+    """Formatea un server-sent event con datos JSON"""
+    return f"event: {nombre}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+def _eventos_rag(pregunta, futuro):
+    """
+    Eventos SSE de una pregunta: 'estado' al aceptarla, comentarios de latido mientras se procesa
+    (mantienen viva la conexión a través de proxies), 'respuesta' o 'error' y 'fin'
+    """
+    yield _evento("estado", {"estado": "procesando", "pregunta": pregunta})
+    limite = time.monotonic() + RAG_TIMEOUT_SEG
+    while True:
+        try:
+            respuesta = futuro.result(timeout=min(RAG_SSE_LATIDO_SEG, max(limite - time.monotonic(), 0)))
+            yield _evento("respuesta", {"pregunta": pregunta, "respuesta": respuesta})
+            break
+        except TiempoAgotado:
+            if time.monotonic() >= limite:
+                futuro.cancel()
+                yield _evento("error", {"error": "La pregunta tardó demasiado en procesarse."})
+                break
+            yield ": latido\n\n"
+        except Exception:
+            logger.error("Error en RAG:\n" + traceback.format_exc())
+            yield _evento("error", {"error": "Ocurrió un error interno al procesar la pregunta."})
+            break
+    yield _evento("fin", {})
+
+SEGUNDOS_IMPORTACION = time.perf_counter() - _inicio_importacion
+logger.info(f"App importada en {SEGUNDOS_IMPORTACION:.2f}s (precarga: {', '.join(PRECARGA) or 'ninguna'})")
+
 # --- Ejecución con Waitress (compatible con Windows y producción) ---
+# Variables de entorno del servidor: PORT, WAITRESS_THREADS y los límites por ruta definidos más arriba
+# (RAG_TRABAJADORES, RAG_MAX_COLA, RAG_TIMEOUT_SEG, PREDICT_MAX_CONCURRENCIA, PREDICT_BATCH_MAX_CONCURRENCIA)
 if __name__ == "__main__":
     from waitress import serve
     port = int(os.environ.get("PORT", 5000)) # Permite configurar el puerto vía variable de entorno
-    serve(app, host="0.0.0.0", port=port) # Inicia la app usando Waitress, adecuada para producción
+    # Hilos de Waitress: por defecto, los que puede ocupar el RAG más 8 para el resto de las rutas
+    threads = int(os.environ.get("WAITRESS_THREADS", RAG_TRABAJADORES + RAG_MAX_COLA + 8))
+    if threads <= RAG_TRABAJADORES + RAG_MAX_COLA:
+        logger.warning("WAITRESS_THREADS no supera las preguntas RAG admitidas: /rag_chat puede ocupar todos los hilos")
+    serve(app, host="0.0.0.0", port=port, threads=threads) # Inicia la app usando Waitress, adecuada para producción
@@ -0,0 +1 @@
+# Benchmarks de rendimiento del proyecto (se ejecutan desde la raíz del repositorio con `python -m benchmarks.<script>`)
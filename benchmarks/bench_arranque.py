@@ -0,0 +1,89 @@
+# ===============================
+# Benchmark: tiempo de arranque y latencia de la primera petición
+# ===============================
+# Mide, en un proceso nuevo por repetición (arranque en frío de un worker):
+# - cuánto tarda "import app" (con la carga perezosa no debe cargar ningún modelo),
+# - la latencia de la primera y de la segunda petición a /predict y a /rag_chat (la primera incluye la carga).
+# Con --precarga se activa PRECARGA y se mide además cuánto tarda /readyz en responder 200.
+# El resultado se imprime como JSON para poder comparar entre versiones y detectar regresiones de arranque.
+#
+# Uso (desde la raíz del repositorio, con el modelo y el índice RAG presentes):
+#     python -m benchmarks.bench_arranque --repeticiones 3
+#     python -m benchmarks.bench_arranque --sin-rag --precarga modelo
+
+# Importo las librerías necesarias
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+# Código que se ejecuta en cada proceso hijo: importa la app y hace las peticiones con el cliente de pruebas de Flask
+PROCESO_HIJO = r"""
+import sys, json, time
+inicio = time.perf_counter()
+import app as aplicacion
+resultado = {"importacion_s": time.perf_counter() - inicio}
+from benchmarks.datos_sinteticos import generar_registros
+cliente = aplicacion.app.test_client()
+opciones = json.loads(sys.argv[1])
+
+if opciones["precarga"]:
+    inicio = time.perf_counter()
+    while cliente.get("/readyz").status_code != 200:
+        time.sleep(0.01)
+    resultado["hasta_listo_s"] = time.perf_counter() - inicio
+
+def medir(ruta, cuerpo):
+    inicio = time.perf_counter()
+    respuesta = cliente.post(ruta, json=cuerpo)
+    assert respuesta.status_code == 200, respuesta.get_json()
+    return time.perf_counter() - inicio
+
+registros = generar_registros(2, semilla=0)
+resultado["predict_primera_s"] = medir("/predict", registros[0])
+resultado["predict_segunda_s"] = medir("/predict", registros[1])
+if opciones["rag"]:
+    resultado["rag_primera_s"] = medir("/rag_chat", {"pregunta": "¿Qué modelo se utilizó?"})
+    resultado["rag_segunda_s"] = medir("/rag_chat", {"pregunta": "¿Qué variables son más importantes?"})
+resultado["subsistemas"] = cliente.get("/readyz").get_json()["subsistemas"]
+print("RESULTADO " + json.dumps(resultado))
+"""
+
+
+def ejecutar_proceso(opciones, precarga):
+    """Lanza un intérprete nuevo (arranque en frío) y devuelve las mediciones que imprime"""
+    entorno = dict(os.environ, PRECARGA=precarga)
+    salida = subprocess.run(
+        [sys.executable, "-c", PROCESO_HIJO, json.dumps(opciones)],
+        env=entorno, capture_output=True, text=True, check=True
+    ).stdout
+    linea = next(l for l in salida.splitlines() if l.startswith("RESULTADO "))
+    return json.loads(linea[len("RESULTADO "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de app.py y latencia de la primera petición")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-rag", action="store_true", help="No mide /rag_chat (procesos que sólo atienden /predict)")
+    parser.add_argument("--precarga", default="", help="Valor de PRECARGA para los procesos (p. ej. 'modelo' o 'todo')")
+    args = parser.parse_args()
+
+    opciones = {"rag": not args.sin_rag, "precarga": bool(args.precarga)}
+    corridas = [ejecutar_proceso(opciones, args.precarga) for _ in range(args.repeticiones)]
+    metricas = [clave for clave in corridas[0] if clave.endswith("_s")]
+    resumen = {
+        "repeticiones": args.repeticiones,
+        "precarga": args.precarga or None,
+        # Mediana de cada métrica entre repeticiones (en segundos)
+        "mediana_s": {clave: round(float(np.median([c[clave] for c in corridas])), 4) for clave in metricas},
+        "carga_subsistemas_s": {
+            nombre: estado["segundos_carga"] for nombre, estado in corridas[-1]["subsistemas"].items()
+        },
+    }
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
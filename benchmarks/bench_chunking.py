@@ -0,0 +1,155 @@
+# ===============================
+# Benchmark: chunker por caracteres vs. chunker por tokens y oraciones
+# ===============================
+# Compara, sobre el mismo documento, el corte fijo de 700 caracteres (smart_chunk) con el chunker por tokens
+# (fragmentacion.py) para uno o varios tamaños máximos: cantidad de chunks, tokens por chunk y cuántos superan
+# lo que codifica el modelo (se truncan), tamaño del índice, tiempo de embeddings, calidad de recuperación
+# y latencia de búsqueda y (opcional) del modelo de QA.
+#
+# La calidad se mide sin preguntas etiquetadas (auto-recuperación): se toman oraciones al azar del documento,
+# se usa como consulta un tramo del 60% de sus palabras y se considera acierto que entre los k chunks
+# recuperados haya uno que contenga la oración completa. Un chunker que corta oraciones por la mitad pierde aciertos.
+#
+# El texto se lee del PDF (--pdf) o, si no está disponible, se reconstruye a partir de los chunks por caracteres
+# de un rag_metadata.json antiguo (--metadatos), que contienen el texto completo con solapamiento de 100 caracteres.
+#
+# Uso (desde la raíz del repositorio):
+#     python -m benchmarks.bench_chunking --metadatos rag_metadata.json --max-tokens 126 64 --qa 50
+
+# Importo las librerías necesarias
+import json
+import time
+import random
+import argparse
+import faiss
+import numpy as np
+from build_rag_index import MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP, chunks_con_paginas, extraer_paginas
+from fragmentacion import fragmentar_paginas, contador_tokens, parrafos, oraciones
+from benchmarks.medicion import resumen_latencias
+
+
+def paginas_desde_metadatos(ruta):
+    """Reconstruye el texto original a partir de chunks de CHUNK_SIZE caracteres solapados CHUNK_OVERLAP"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    return [chunks[0] + "".join(chunk[CHUNK_OVERLAP:] for chunk in chunks[1:])]
+
+
+def generar_consultas(paginas, n, semilla=0):
+    """Oraciones de al menos 8 palabras y, como consulta, un tramo del 60% de sus palabras"""
+    candidatas = [o for pagina in paginas for p in parrafos(pagina) for o in oraciones(p) if len(o.split()) >= 8]
+    rng = random.Random(semilla)
+    consultas = []
+    for oracion in rng.sample(candidatas, min(n, len(candidatas))):
+        palabras = oracion.split()
+        largo = max(5, int(len(palabras) * 0.6))
+        inicio = rng.randint(0, len(palabras) - largo)
+        consultas.append((" ".join(palabras[inicio:inicio + largo]), oracion))
+    return consultas
+
+
+def evaluar(nombre, fragmentar, paginas, consultas, modelo, contar, k, qa, n_qa):
+    """Construye el índice con los chunks del chunker y mide calidad y latencias"""
+    inicio = time.perf_counter()
+    chunks, _ = fragmentar(paginas)
+    segundos_chunking = time.perf_counter() - inicio
+    tokens = np.array(contar(chunks))
+    limite = modelo.max_seq_length - 2
+
+    inicio = time.perf_counter()
+    embeddings = np.asarray(modelo.encode(chunks, batch_size=64), dtype=np.float32)
+    segundos_embeddings = time.perf_counter() - inicio
+    indice = faiss.IndexFlatL2(embeddings.shape[1])
+    indice.add(embeddings)
+
+    # Se compara con espacios normalizados: los chunks por caracteres conservan los saltos de línea del PDF
+    normalizados = [" ".join(chunk.split()) for chunk in chunks]
+    aciertos_1 = aciertos_k = rr = 0
+    latencias, recuperados = [], []
+    for consulta, oracion in consultas:
+        inicio = time.perf_counter()
+        emb = np.asarray(modelo.encode([consulta]), dtype=np.float32)
+        _, ids = indice.search(emb, k)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        ids = [int(i) for i in ids[0] if i >= 0]
+        recuperados.append(ids)
+        posiciones = [r for r, i in enumerate(ids) if oracion in normalizados[i]]
+        if posiciones:
+            aciertos_k += 1
+            aciertos_1 += posiciones[0] == 0
+            rr += 1 / (posiciones[0] + 1)
+
+    resultado = {
+        "chunker": nombre,
+        "chunks": len(chunks),
+        "caracteres_totales": int(sum(len(c) for c in chunks)),
+        "tokens_por_chunk": {"media": round(float(tokens.mean()), 1), "max": int(tokens.max())},
+        "chunks_truncados": int((tokens > limite).sum()), # Superan lo que codifica el modelo de embeddings
+        "indice_mb": round(len(faiss.serialize_index(indice)) / 2**20, 3),
+        "chunking_s": round(segundos_chunking, 3),
+        "embeddings_s": round(segundos_embeddings, 3),
+        "recall@1": round(aciertos_1 / len(consultas), 4),
+        f"recall@{k}": round(aciertos_k / len(consultas), 4),
+        f"mrr@{k}": round(rr / len(consultas), 4),
+        "busqueda": resumen_latencias(np.array(latencias)),
+    }
+
+    if qa is not None and n_qa:
+        # Latencia del modelo de QA con el contexto de los k chunks recuperados (como en /rag_chat)
+        latencias_qa, tokens_contexto = [], []
+        for (consulta, _), ids in list(zip(consultas, recuperados))[:n_qa]:
+            contexto = "\n\n".join(chunks[i] for i in ids)
+            tokens_contexto.append(sum(contar([contexto])))
+            inicio = time.perf_counter()
+            qa({"question": consulta, "context": contexto})
+            latencias_qa.append((time.perf_counter() - inicio) * 1000)
+        resultado["qa"] = resumen_latencias(np.array(latencias_qa))
+        resultado["qa"]["tokens_contexto_media"] = round(float(np.mean(tokens_contexto)), 1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calidad de recuperación y latencia: chunker por caracteres vs. por tokens")
+    parser.add_argument("--pdf", default=None, help="PDF del que se extrae el texto")
+    parser.add_argument("--metadatos", default="rag_metadata.json",
+                        help="rag_metadata.json con chunks por caracteres (si no se indica --pdf)")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[126], help="Tamaños del chunker por tokens")
+    parser.add_argument("--solapamiento-tokens", type=int, default=24)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--qa", type=int, default=0, help="Consultas con las que medir la latencia del modelo de QA")
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    modelo = SentenceTransformer(MODEL_NAME)
+    contar = contador_tokens(modelo.tokenizer)
+    qa = None
+    if args.qa:
+        from transformers import pipeline
+        from chat_rag_local import QA_MODEL
+        qa = pipeline("question-answering", model=QA_MODEL, tokenizer=QA_MODEL)
+
+    paginas = extraer_paginas(args.pdf) if args.pdf else paginas_desde_metadatos(args.metadatos)
+    consultas = generar_consultas(paginas, args.consultas)
+
+    chunkers = [(f"caracteres_{CHUNK_SIZE}_{CHUNK_OVERLAP}", chunks_con_paginas)]
+    for max_tokens in args.max_tokens:
+        chunkers.append((
+            f"tokens_{max_tokens}",
+            lambda p, m=max_tokens: fragmentar_paginas(p, contar, m, args.solapamiento_tokens)
+        ))
+    resultados = {
+        "modelo": MODEL_NAME,
+        "consultas": len(consultas),
+        "k": args.k,
+        "chunkers": [evaluar(nombre, f, paginas, consultas, modelo, contar, args.k, qa, args.qa) for nombre, f in chunkers],
+    }
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
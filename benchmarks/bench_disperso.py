@@ -0,0 +1,66 @@
+# ===============================
+# Benchmark: pipeline denso vs. modo disperso para puntuación masiva
+# ===============================
+# Compara tiempo, memoria pico (tracemalloc) y tamaño de la matriz de features del pipeline original
+# con el mismo pipeline en modo disperso (pipeline_disperso), y verifica que las probabilidades coincidan.
+#
+# Uso (desde la raíz del repositorio, con pipeline_modelo_completo.pkl presente):
+#     python -m benchmarks.bench_disperso --filas 200000
+
+# Importo las librerías necesarias
+import time
+import argparse
+import tracemalloc
+import joblib
+import numpy as np
+from scipy import sparse as sp
+from onehot_transformer import pipeline_disperso
+from benchmarks.datos_sinteticos import generar_dataframe
+from benchmarks.medicion import silenciar_stdout
+
+
+def tamano_matriz(X):
+    """Bytes ocupados por la matriz de features (densa o CSR)"""
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.to_numpy().nbytes if hasattr(X, "to_numpy") else X.nbytes
+
+
+def medir(modelo, df):
+    """Ejecuta predict_proba midiendo tiempo y memoria pico, y calcula la matriz de features por separado"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    probabilidades = modelo.predict_proba(df)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    X = df
+    for _, paso in modelo.steps[:-1]:
+        X = paso.transform(X)
+    return probabilidades, segundos, pico, tamano_matriz(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del modo disperso del one-hot")
+    parser.add_argument("--modelo", default="pipeline_modelo_completo.pkl")
+    parser.add_argument("--filas", type=int, default=200000)
+    args = parser.parse_args()
+
+    modelo = joblib.load(args.modelo)
+    df = generar_dataframe(args.filas)
+
+    with silenciar_stdout():
+        denso = medir(modelo, df)
+        disperso = medir(pipeline_disperso(modelo), df)
+
+    print(f"Filas: {args.filas}")
+    print(f"{'modo':<10}{'tiempo (s)':>12}{'filas/s':>12}{'pico (MB)':>12}{'matriz (MB)':>13}")
+    for nombre, (_, segundos, pico, tamano) in (("denso", denso), ("disperso", disperso)):
+        print(f"{nombre:<10}{segundos:>12.3f}{args.filas / segundos:>12.0f}{pico / 2**20:>12.1f}{tamano / 2**20:>13.1f}")
+    # El producto disperso puede sumar en otro orden, por eso se compara con tolerancia
+    print(f"Máxima diferencia de probabilidad: {np.max(np.abs(denso[0] - disperso[0])):.2e}")
+
+
+if __name__ == "__main__":
+    main()
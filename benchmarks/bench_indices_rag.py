@@ -0,0 +1,105 @@
+# ===============================
+# Benchmark: recall@k vs. latencia de los tipos de índice FAISS
+# ===============================
+# Compara cada configuración de índice aproximado (IVF, IVF-PQ, PQ, HNSW) con el índice plano exacto
+# de la misma métrica: recall@k respecto de los vecinos exactos, latencia media por consulta y tamaño en memoria.
+# Por defecto usa los vectores del índice incluido en el repositorio (rag_index.faiss); con --sinteticos N
+# genera N vectores agrupados de la misma dimensión para simular un corpus mucho mayor.
+#
+# Uso (desde la raíz del repositorio):
+#     python -m benchmarks.bench_indices_rag --sinteticos 100000 --k 5
+
+# Importo las librerías necesarias
+import time
+import json
+import argparse
+import faiss
+import numpy as np
+from indices_rag import construir_indice, configurar_busqueda, preparar_vectores
+
+# Configuraciones a comparar: (tipo, parámetros de construcción, parámetro de búsqueda a barrer, valores)
+CONFIGURACIONES = [
+    ("ivf", {"nlist": 256}, "nprobe", [1, 4, 16, 64]),
+    ("ivfpq", {"nlist": 256, "pq_m": 48, "pq_bits": 8}, "nprobe", [4, 16, 64]),
+    ("pq", {"pq_m": 48, "pq_bits": 8}, None, [None]),
+    ("hnsw", {"hnsw_m": 32, "ef_construction": 200}, "ef_search", [16, 32, 64, 128]),
+]
+
+
+def vectores_sinteticos(n, d, semilla=0):
+    """Vectores agrupados en clusters (más parecidos a embeddings reales que el ruido uniforme)"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((max(n // 200, 1), d)).astype(np.float32)
+    asignacion = rng.integers(0, len(centros), n)
+    return centros[asignacion] + 0.5 * rng.standard_normal((n, d)).astype(np.float32)
+
+
+def recall_en_k(aproximados, exactos):
+    """Fracción de los k vecinos exactos que aparecen entre los k aproximados"""
+    return float(np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(aproximados, exactos)]))
+
+
+def medir_busqueda(indice, consultas, k):
+    """Latencia media (ms) por consulta, buscando una consulta a la vez como hace /rag_chat"""
+    resultados = []
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        _, ids = indice.search(consulta[None, :], k)
+        resultados.append(ids[0])
+    return np.array(resultados), (time.perf_counter() - inicio) * 1000 / len(consultas)
+
+
+def tamano_mb(indice):
+    return len(faiss.serialize_index(indice)) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs. latencia de índices FAISS aproximados")
+    parser.add_argument("--indice", default="rag_index.faiss", help="Índice plano del que se leen los vectores")
+    parser.add_argument("--sinteticos", type=int, default=0, help="Cantidad de vectores sintéticos (0 = usar --indice)")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--metrica", choices=("l2", "ip"), default="l2")
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    if args.sinteticos:
+        vectores = vectores_sinteticos(args.sinteticos, 384)
+    else:
+        base = faiss.read_index(args.indice)
+        vectores = base.reconstruct_n(0, base.ntotal)
+    # Las consultas son vectores del corpus con ruido (preguntas "cercanas" a algún chunk)
+    rng = np.random.default_rng(1)
+    consultas = vectores[rng.integers(0, len(vectores), args.consultas)]
+    consultas = consultas + 0.1 * consultas.std() * rng.standard_normal(consultas.shape).astype(np.float32)
+    consultas = preparar_vectores(consultas, args.metrica)
+
+    plano, _ = construir_indice(vectores, tipo="flat", metrica=args.metrica)
+    exactos, latencia_plano = medir_busqueda(plano, consultas, args.k)
+    filas = [{"tipo": "flat", "parametro": None, "valor": None, "recall": 1.0,
+              "latencia_ms": latencia_plano, "tamano_mb": tamano_mb(plano)}]
+
+    for tipo, opciones, parametro, valores in CONFIGURACIONES:
+        indice, config = construir_indice(vectores, tipo=tipo, metrica=args.metrica, **opciones)
+        for valor in valores:
+            # El parámetro de búsqueda se cambia sobre el mismo índice, sin reconstruirlo
+            if parametro:
+                config[parametro] = valor
+                configurar_busqueda(indice, config)
+            aproximados, latencia = medir_busqueda(indice, consultas, args.k)
+            filas.append({"tipo": tipo, "parametro": parametro, "valor": config.get(parametro) if parametro else None,
+                          "recall": recall_en_k(aproximados, exactos), "latencia_ms": latencia,
+                          "tamano_mb": tamano_mb(indice)})
+
+    print(f"Vectores: {len(vectores)}  |  Consultas: {len(consultas)}  |  k={args.k}  |  métrica={args.metrica}")
+    print(f"{'tipo':<8}{'parámetro':<14}{'recall@k':>10}{'ms/consulta':>13}{'MB':>9}")
+    for fila in filas:
+        etiqueta = f"{fila['parametro']}={fila['valor']}" if fila["parametro"] else "-"
+        print(f"{fila['tipo']:<8}{etiqueta:<14}{fila['recall']:>10.3f}{fila['latencia_ms']:>13.4f}{fila['tamano_mb']:>9.2f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(filas, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# ===============================
+# Benchmark: inferencia en una pasada vs. predict + predict_proba
+# ===============================
+# Compara la latencia por registro (p50/p99) de la ruta anterior de /predict, que recorría el pipeline dos veces,
+# con el camino compartido `inferir`, que lo recorre una sola vez.
+#
+# Uso (desde la raíz del repositorio, con pipeline_modelo_completo.pkl presente):
+#     python -m benchmarks.bench_inferencia --registros 500
+
+# Importo las librerías necesarias
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from inferencia import inferir
+from benchmarks.datos_sinteticos import generar_registros
+from benchmarks.medicion import medir_latencias, resumen_latencias, silenciar_stdout
+
+
+def inferencia_anterior(modelo, registro):
+    """Ruta anterior: dos recorridos del pipeline por petición"""
+    df = pd.DataFrame([registro])
+    prediccion = int(modelo.predict(df)[0])
+    probabilidad = float(modelo.predict_proba(df)[0][1])
+    return prediccion, probabilidad
+
+
+def inferencia_una_pasada(modelo, registro):
+    """Ruta actual: un único predict_proba y la clase derivada del umbral"""
+    clases, probabilidades = inferir(modelo, pd.DataFrame([registro]))
+    return int(clases[0]), float(probabilidades[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia de /predict (una pasada vs. dos pasadas)")
+    parser.add_argument("--modelo", default="pipeline_modelo_completo.pkl")
+    parser.add_argument("--registros", type=int, default=500)
+    args = parser.parse_args()
+
+    modelo = joblib.load(args.modelo)
+    registros = generar_registros(args.registros)
+
+    with silenciar_stdout():
+        # Verifica que ambas rutas den el mismo resultado con el umbral por defecto
+        discrepancias = sum(
+            inferencia_anterior(modelo, r)[0] != inferencia_una_pasada(modelo, r)[0] for r in registros[:100]
+        )
+        anterior = medir_latencias(lambda r: inferencia_anterior(modelo, r), registros)
+        actual = medir_latencias(lambda r: inferencia_una_pasada(modelo, r), registros)
+
+    res_anterior, res_actual = resumen_latencias(anterior), resumen_latencias(actual)
+    print(f"Discrepancias de clase en 100 registros: {discrepancias}")
+    print(f"{'ruta':<24}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    print(f"{'predict + predict_proba':<24}{res_anterior['p50_ms']:>12.3f}{res_anterior['p99_ms']:>12.3f}")
+    print(f"{'inferir (una pasada)':<24}{res_actual['p50_ms']:>12.3f}{res_actual['p99_ms']:>12.3f}")
+    print(f"Reducción p50: {1 - np.median(actual) / np.median(anterior):.1%}  |  "
+          f"Reducción p99: {1 - np.percentile(actual, 99) / np.percentile(anterior, 99):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# ===============================
+# Latencia del plan de fila frente al pipeline de pandas
+# ===============================
+# Compara la latencia por registro de PlanFila y del pipeline completo con registros sintéticos y casos límite
+# de las reglas de preprocesamiento (bordes del binning de edad, pdays == 999, categorías no vistas).
+# La paridad exacta de ambos caminos se comprueba en tests/test_plan_fila.py, con el mismo pipeline y los mismos casos.
+# Sin --modelo no necesita el modelo entrenado: se ajusta un pipeline con la misma estructura sobre datos sintéticos.
+#
+# Uso (desde la raíz del repositorio):
+#     python -m benchmarks.bench_plan_fila --registros 2000
+#     python -m benchmarks.bench_plan_fila --modelo pipeline_modelo_completo.pkl
+
+# Importo las librerías necesarias
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+from preprocessing import PreprocessingTransformer
+from onehot_transformer import OneHotEncoderTransformer
+from manual_scaler import ManualScaler
+from feature_selector import FeatureSelector
+from plan_fila import PlanFila
+from benchmarks.datos_sinteticos import generar_dataframe, generar_registros
+from benchmarks.bench_preprocesamiento import COLUMNAS_CATEGORICAS, COLUMNAS_NUMERICAS
+from benchmarks.medicion import medir_latencias, resumen_latencias, silenciar_stdout
+
+def pipeline_sintetico(filas=5000, semilla=0):
+    """
+    Pipeline con la misma estructura que el modelo entrenado, ajustado sobre datos sintéticos.
+    El selector conserva las numéricas y parte de las columnas one-hot (algunas categorías quedan fuera)
+    """
+    df = generar_dataframe(filas, semilla)
+    rng = np.random.default_rng(semilla + 1)
+    puntaje = df["duration"] / 800 + (df["poutcome"] == "success") * 2 - df["euribor3m"] / 2 + rng.normal(0, 1, filas)
+    y = (puntaje > 1).astype(int)
+    onehot = OneHotEncoderTransformer(COLUMNAS_CATEGORICAS).fit(PreprocessingTransformer().transform(df))
+    seleccion = COLUMNAS_NUMERICAS + [c for i, c in enumerate(onehot.feature_names_out) if i % 4 != 3]
+    modelo = Pipeline([
+        ("preprocesamiento", PreprocessingTransformer()),
+        ("onehot", OneHotEncoderTransformer(COLUMNAS_CATEGORICAS)),
+        ("escalador", ManualScaler(COLUMNAS_NUMERICAS)),
+        ("selector", FeatureSelector(seleccion)),
+        ("modelo", LogisticRegression(max_iter=1000)),
+    ])
+    return modelo.fit(df, y)
+
+
+def casos_limite(base):
+    """Registros que ejercitan cada regla de imputación, los bordes del binning de edad y categorías desconocidas"""
+    casos = []
+    for age in (0, 17, 25, 25.5, 40, 40.01, 60, 60.5, 61, 140, 141, -1):
+        casos.append({**base, "age": float(age)})
+    for job, education in [("unknown", "unknown"), ("management", "unknown"), ("services", "unknown"),
+                           ("housemaid", "unknown"), ("unknown", "basic.4y"), ("unknown", "basic.6y"),
+                           ("unknown", "basic.9y"), ("unknown", "professional.course"), ("unknown", "illiterate")]:
+        casos.append({**base, "job": job, "education": education, "age": 35.0})
+        casos.append({**base, "job": job, "education": education, "age": 70.0})
+    for pdays, previous in ((999.0, 0.0), (999.0, 1.0), (0.0, 1.0), (3.0, 2.0), (998.0, 0.0)):
+        casos.append({**base, "pdays": pdays, "previous": previous})
+    casos.append({**base, "month": "jan", "day_of_week": "sun"})
+    casos.append({**base, "job": "astronaut", "marital": "complicated", "poutcome": "other"})
+    return casos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de PlanFila frente al pipeline de pandas")
+    parser.add_argument("--modelo", default=None,
+                        help="Pipeline entrenado (.pkl); sin él se ajusta uno sobre datos sintéticos")
+    parser.add_argument("--registros", type=int, default=2000)
+    args = parser.parse_args()
+
+    with silenciar_stdout():
+        modelo = joblib.load(args.modelo) if args.modelo else pipeline_sintetico()
+    plan = PlanFila(modelo)
+    # Registros con otra semilla que la del ajuste, más los casos límite sobre varios registros base
+    registros = generar_registros(args.registros, semilla=7)
+    registros += [caso for base in registros[:5] for caso in casos_limite(base)]
+
+    with silenciar_stdout():
+        pandas_ms = medir_latencias(lambda r: modelo.predict_proba(pd.DataFrame([r])), registros)
+        plan_ms = medir_latencias(lambda r: plan.predict_proba([r]), registros)
+
+    print(f"Registros: {len(registros)}")
+    for nombre, latencias in (("pipeline pandas", pandas_ms), ("plan de fila", plan_ms)):
+        res = resumen_latencias(latencias)
+        print(f"{nombre:<16} p50 {res['p50_ms']:.3f} ms  p99 {res['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
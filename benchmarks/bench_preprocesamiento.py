@@ -0,0 +1,171 @@
+# ===============================
+# Benchmark: preprocesamiento vectorizado vs. implementación original
+# ===============================
+# Compara PreprocessingTransformer, OneHotEncoderTransformer y ManualScaler con sus versiones originales
+# (apply fila a fila, máscaras .loc encadenadas, concatenación de texto y copias completas del DataFrame),
+# verifica que las salidas sean idénticas y mide el tiempo con 1 fila y con un dataset del tamaño de Bank Marketing.
+# No necesita el modelo entrenado: los transformadores se ajustan sobre los datos sintéticos.
+#
+# La referencia es el código original tal cual, con una única diferencia conocida en la salida, que se verifica
+# explícitamente en lugar de ocultarla: cuando todas las filas tienen pdays == 999 (p. ej. con una sola fila),
+# el apply original devuelve pdays como int64 y la versión vectorizada como float64, con los mismos valores.
+# El replace(inplace=True) original sobre month / day_of_week sólo funciona sin Copy-on-Write (pandas < 3):
+# con Copy-on-Write el código original deja esas columnas como texto y el benchmark se detiene avisándolo.
+#
+# Uso (desde la raíz del repositorio):
+#     python -m benchmarks.bench_preprocesamiento --filas 41188
+
+# Importo las librerías necesarias
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from preprocessing import PreprocessingTransformer
+from onehot_transformer import OneHotEncoderTransformer
+from manual_scaler import ManualScaler
+from benchmarks.datos_sinteticos import generar_dataframe, FILAS_BANK_MARKETING
+from benchmarks.medicion import medir_latencias, resumen_latencias
+
+COLUMNAS_CATEGORICAS = ['job', 'marital', 'education', 'default', 'housing', 'loan', 'contact', 'poutcome',
+                        'age_binned', 'job_grouped', 'education_grouped', 'life_stage', 'socio-economic']
+COLUMNAS_NUMERICAS = ['age', 'duration', 'campaign', 'pdays', 'previous', 'emp.var.rate', 'cons.price.idx',
+                      'cons.conf.idx', 'euribor3m', 'month', 'day_of_week', 'contacted_previously']
+
+
+# ==== Implementaciones originales (referencia) ====
+def preprocesamiento_original(X):
+    X = X.copy()
+    X.loc[(X['age'] > 60) & (X['job'] == 'unknown'), 'job'] = 'retired'
+    X.loc[(X['education'] == 'unknown') & (X['job'] == 'management'), 'education'] = 'university.degree'
+    X.loc[(X['education'] == 'unknown') & (X['job'] == 'services'), 'education'] = 'high.school'
+    X.loc[(X['education'] == 'unknown') & (X['job'] == 'housemaid'), 'education'] = 'basic.4y'
+    X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.4y'), 'job'] = 'blue-collar'
+    X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.6y'), 'job'] = 'blue-collar'
+    X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.9y'), 'job'] = 'blue-collar'
+    X.loc[(X['job'] == 'unknown') & (X['education'] == 'professional.course'), 'job'] = 'technician'
+    X['pdays'] = X['pdays'].apply(lambda x: 0 if x == 999 else x)
+    with warnings.catch_warnings():
+        # Tal cual el original: pandas 2 advierte (FutureWarning) del replace encadenado con inplace=True
+        warnings.simplefilter("ignore", FutureWarning)
+        X['month'].replace(
+            ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), range(1, 13), inplace=True)
+        X['day_of_week'].replace(('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'), range(1, 8), inplace=True)
+    X['age_binned'] = pd.cut(X['age'], bins=[0, 25, 40, 60, 140],
+                             labels=['young', 'lower middle aged', 'middle aged', 'senior'], right=True, include_lowest=True)
+    X['job_grouped'] = X['job'].map({
+        'admin.': 'White-collar', 'management': 'White-collar', 'technician': 'White-collar',
+        'blue-collar': 'Blue-collar', 'services': 'Blue-collar', 'housemaid': 'Blue-collar',
+        'entrepreneur': 'Self-employed', 'self-employed': 'Self-employed',
+        'retired': 'Non-active', 'student': 'Non-active', 'unemployed': 'Non-active', 'unknown': 'Other'})
+    X['education_grouped'] = X['education'].map({
+        'basic.9y': 'Basic', 'basic.4y': 'Basic', 'basic.6y': 'Basic', 'high.school': 'Middle',
+        'professional.course': 'Middle', 'university.degree': 'Superior', 'unknown': 'Other', 'illiterate': 'Other'})
+    X['contacted_previously'] = (X['previous'] >= 1).astype(int)
+    X['life_stage'] = X['age_binned'].astype(str) + ' & ' + X['marital']
+    X['socio-economic'] = X['job'].astype(str) + ' & ' + X['education']
+    X.drop(columns=['nr.employed'], inplace=True)
+    return X
+
+
+def onehot_original(transformador, X):
+    X = X.copy()
+    encoded = transformador.encoder.transform(X[transformador.categorical_cols].astype(str))
+    df_encoded = pd.DataFrame(encoded, columns=transformador.feature_names_out, index=X.index)
+    X.drop(columns=transformador.categorical_cols, inplace=True)
+    return pd.concat([X, df_encoded], axis=1)
+
+
+def escalado_original(transformador, X):
+    X = X.copy()
+    X[transformador.numeric_cols] = transformador.scaler.transform(X[transformador.numeric_cols])
+    return X
+
+
+def comparar(esperado, obtenido):
+    """
+    Verifica que ambas salidas sean idénticas. La única diferencia admitida es el dtype de pdays
+    (int64 en el original cuando todos los valores son 999, float64 en la versión vectorizada), que se comprueba
+    explícitamente; devuelve True si se dio ese caso
+    """
+    diferencia_pdays = "pdays" in esperado and esperado["pdays"].dtype != obtenido["pdays"].dtype
+    if diferencia_pdays:
+        assert esperado["pdays"].dtype == np.int64 and obtenido["pdays"].dtype == np.float64, (
+            f"dtype de pdays inesperado: {esperado['pdays'].dtype} / {obtenido['pdays'].dtype}")
+        np.testing.assert_array_equal(esperado["pdays"].to_numpy(), obtenido["pdays"].to_numpy())
+        esperado, obtenido = esperado.drop(columns="pdays"), obtenido.drop(columns="pdays")
+    pd.testing.assert_frame_equal(esperado, obtenido)
+    return diferencia_pdays
+
+
+def replace_inplace_efectivo():
+    """Si Series.replace(inplace=True) sobre una columna modifica el DataFrame (no es así con Copy-on-Write)"""
+    X = pd.DataFrame({"month": ["jan"]})
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        X["month"].replace(("jan",), (1,), inplace=True)
+    return X["month"].iloc[0] == 1
+
+
+# ==== Medición ====
+def tiempo_minimo(funcion, repeticiones):
+    """Mejor tiempo (s) de varias ejecuciones, para reducir el ruido en el caso masivo"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del preprocesamiento vectorizado")
+    parser.add_argument("--filas", type=int, default=FILAS_BANK_MARKETING)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--filas-individuales", type=int, default=300)
+    args = parser.parse_args()
+    if not replace_inplace_efectivo():
+        raise SystemExit(f"Con pandas {pd.__version__} (Copy-on-Write) el preprocesamiento original no convierte "
+                         "month ni day_of_week: no sirve como referencia")
+
+    df = generar_dataframe(args.filas)
+    # Se fuerzan casos de las reglas de imputación que el muestreo aleatorio cubre poco
+    df.loc[df.index[:50], ['job', 'age']] = ['unknown', 70.0]
+    df.loc[df.index[50:100], ['job', 'education']] = ['unknown', 'basic.6y']
+    df.loc[df.index[100:150], ['job', 'education']] = ['management', 'unknown']
+
+    # Ajuste de los transformadores sobre los datos preprocesados
+    preprocesamiento = PreprocessingTransformer()
+    pre = preprocesamiento.transform(df)
+    onehot = OneHotEncoderTransformer(COLUMNAS_CATEGORICAS).fit(pre)
+    codificado = onehot.transform(pre)
+    escalador = ManualScaler(COLUMNAS_NUMERICAS).fit(codificado)
+
+    etapas = [
+        ("PreprocessingTransformer", lambda X: preprocesamiento_original(X), preprocesamiento.transform, df),
+        ("OneHotEncoderTransformer", lambda X: onehot_original(onehot, X), onehot.transform, pre),
+        ("ManualScaler", lambda X: escalado_original(escalador, X), escalador.transform, codificado),
+    ]
+
+    print(f"Filas en el caso masivo: {args.filas}")
+    print(f"{'etapa':<26}{'masivo orig (s)':>16}{'masivo nuevo (s)':>17}{'1 fila orig p50 (ms)':>22}{'1 fila nuevo p50 (ms)':>23}")
+    diferencias_pdays = 0
+    for nombre, original, nuevo, entrada in etapas:
+        # Equivalencia de salidas en el caso masivo y con una sola fila
+        diferencias_pdays += comparar(original(entrada), nuevo(entrada))
+        for i in range(min(args.filas_individuales, len(entrada))):
+            diferencias_pdays += comparar(original(entrada.iloc[[i]]), nuevo(entrada.iloc[[i]]))
+
+        masivo_orig = tiempo_minimo(lambda: original(entrada), args.repeticiones)
+        masivo_nuevo = tiempo_minimo(lambda: nuevo(entrada), args.repeticiones)
+        filas = [entrada.iloc[[i]] for i in range(min(args.filas_individuales, len(entrada)))]
+        fila_orig = resumen_latencias(medir_latencias(original, filas))["p50_ms"]
+        fila_nuevo = resumen_latencias(medir_latencias(nuevo, filas))["p50_ms"]
+        print(f"{nombre:<26}{masivo_orig:>16.4f}{masivo_nuevo:>17.4f}{fila_orig:>22.3f}{fila_nuevo:>23.3f}")
+    print("Salidas idénticas a la implementación original: OK "
+          f"(pdays int64 en el original y float64 en la versión vectorizada, mismos valores, en {diferencias_pdays} comparaciones)")
+
+
+if __name__ == "__main__":
+    np.seterr(all="ignore")
+    main()
@@ -0,0 +1,51 @@
+# ===============================
+# Generador de registros sintéticos de Bank Marketing
+# ===============================
+# Genera registros con las mismas variables y valores posibles que el dataset original (variables_requeridas),
+# con las variables numéricas ya convertidas a float, para usarlos en los benchmarks sin depender de datos reales.
+
+# Importo las librerías necesarias
+import numpy as np
+import pandas as pd
+
+# Valores posibles de cada variable categórica (tal como aparecen en el dataset bank-additional-full)
+CATEGORIAS = {
+    "job": ["admin.", "blue-collar", "technician", "services", "management", "retired", "entrepreneur",
+            "self-employed", "housemaid", "unemployed", "student", "unknown"],
+    "marital": ["married", "single", "divorced", "unknown"],
+    "education": ["university.degree", "high.school", "basic.9y", "professional.course", "basic.4y",
+                  "basic.6y", "unknown", "illiterate"],
+    "default": ["no", "unknown", "yes"],
+    "housing": ["yes", "no", "unknown"],
+    "loan": ["no", "yes", "unknown"],
+    "contact": ["cellular", "telephone"],
+    "month": ["mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+    "day_of_week": ["mon", "tue", "wed", "thu", "fri"],
+    "poutcome": ["nonexistent", "failure", "success"],
+}
+
+# Tamaño del dataset original (bank-additional-full.csv)
+FILAS_BANK_MARKETING = 41188
+
+
+def generar_dataframe(n=FILAS_BANK_MARKETING, semilla=0):
+    """Genera un DataFrame sintético de n filas con todas las variables requeridas"""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({col: rng.choice(valores, n) for col, valores in CATEGORIAS.items()})
+    df["age"] = rng.integers(17, 99, n).astype(float)
+    df["duration"] = rng.integers(0, 4000, n).astype(float)
+    df["campaign"] = rng.integers(1, 50, n).astype(float)
+    # La mayoría de los clientes no fueron contactados antes (pdays = 999)
+    df["pdays"] = np.where(rng.random(n) < 0.96, 999, rng.integers(0, 28, n)).astype(float)
+    df["previous"] = rng.integers(0, 8, n).astype(float)
+    df["emp.var.rate"] = rng.choice([-3.4, -2.9, -1.8, -1.1, -0.1, 1.1, 1.4], n)
+    df["cons.price.idx"] = rng.uniform(92.2, 94.8, n).round(3)
+    df["cons.conf.idx"] = rng.uniform(-50.8, -26.9, n).round(1)
+    df["euribor3m"] = rng.uniform(0.63, 5.05, n).round(3)
+    df["nr.employed"] = rng.uniform(4963.6, 5228.1, n).round(1)
+    return df
+
+
+def generar_registros(n, semilla=0):
+    """Genera n registros sintéticos como lista de diccionarios (el formato que recibe /predict)"""
+    return generar_dataframe(n, semilla).to_dict("records")
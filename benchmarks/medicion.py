@@ -0,0 +1,66 @@
+# ===============================
+# Utilidades de medición para los benchmarks
+# ===============================
+
+# Importo las librerías necesarias
+import os
+import sys
+import time
+import contextlib
+import numpy as np
+
+
+def medir_latencias(funcion, argumentos, calentamiento=5):
+    """Ejecuta funcion(arg) para cada argumento y devuelve las latencias individuales en milisegundos"""
+    for arg in argumentos[:calentamiento]:
+        funcion(arg)
+    latencias = []
+    for arg in argumentos:
+        inicio = time.perf_counter()
+        funcion(arg)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return np.array(latencias)
+
+
+def resumen_latencias(latencias_ms):
+    """Resume un array de latencias (ms) en media, p50, p90 y p99"""
+    return {
+        "n": int(len(latencias_ms)),
+        "media_ms": round(float(np.mean(latencias_ms)), 4),
+        "p50_ms": round(float(np.percentile(latencias_ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(latencias_ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(latencias_ms, 99)), 4),
+    }
+
+
+@contextlib.contextmanager
+def silenciar_stdout():
+    """Descarta lo que se imprime por stdout durante la medición (p. ej. mensajes de carga de los modelos)"""
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def rss_pico_mb():
+    """RSS máximo alcanzado por el proceso, en MB (None donde no existe el módulo resource, como en Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+
+# Preguntas fijas sobre el documento indexado (el TFM del modelo de Bank Marketing) para los benchmarks del RAG
+PREGUNTAS_RAG = [
+    "¿Cuál es el objetivo del trabajo?",
+    "¿Qué modelo obtuvo el mejor rendimiento?",
+    "¿Cómo se trataron los valores unknown?",
+    "¿Qué variables se eliminaron por redundantes?",
+    "¿Qué métricas se usaron para evaluar los modelos?",
+    "¿Cómo se manejó el desbalance de clases?",
+    "¿Qué significa el valor 999 en pdays?",
+    "¿Qué variables socioeconómicas tiene el dataset?",
+    "¿Cómo se agrupó la edad de los clientes?",
+    "¿Qué red neuronal se entrenó?",
+]
@@ -0,0 +1,149 @@
+# ===============================
+# Paridad, latencia y memoria de los backends del RAG (torch, onnx, onnx-int8)
+# ===============================
+# Cada backend se mide en un proceso nuevo (RAG_BACKEND distinto, memoria independiente) con el mismo conjunto
+# fijo de preguntas y sin cachés: tiempo de carga de los modelos y el índice, RSS pico del proceso, latencia del
+# encode de la pregunta, de la recuperación (encode + FAISS) y de la respuesta completa (recuperación + QA).
+# La paridad se mide contra el backend de referencia (torch, los modelos actuales):
+# - similitud coseno de los embeddings de cada pregunta,
+# - chunks recuperados: coincidencia del primero y solapamiento de los k,
+# - respuestas del QA: coincidencia exacta y F1 por palabras (como en SQuAD).
+# Si algún backend queda por debajo de los mínimos (--min-coseno, --min-f1) el proceso sale con código 1.
+#
+# Uso (desde la raíz del repositorio, con el índice RAG y los modelos exportados con exportar_modelos_rag.py):
+#     python -m benchmarks.paridad_backends_rag
+#     python -m benchmarks.paridad_backends_rag --backends torch onnx-int8 --salida paridad_backends.json
+
+# Importo las librerías necesarias
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from collections import Counter
+import numpy as np
+from benchmarks.medicion import resumen_latencias, silenciar_stdout, rss_pico_mb, PREGUNTAS_RAG
+
+
+def medir_backend(preguntas, k):
+    """Se ejecuta en el proceso hijo, con RAG_BACKEND ya fijado en el entorno"""
+    with silenciar_stdout():
+        import chat_rag_local
+        rss_inicial = rss_pico_mb()
+        inicio = time.perf_counter()
+        modelo = chat_rag_local.embedding_model.obtener()
+        chat_rag_local.qa_pipeline.obtener()
+        chat_rag_local.indice_rag.obtener()
+        segundos_carga = time.perf_counter() - inicio
+        rss_carga = rss_pico_mb()
+
+        # Calentamiento (la primera inferencia de ONNX Runtime y de PyTorch es más lenta)
+        chat_rag_local.responder_pregunta(preguntas[0])
+        embeddings, ids, respuestas = [], [], []
+        latencias = {"encode": [], "recuperacion": [], "respuesta": []}
+        for pregunta in preguntas:
+            inicio = time.perf_counter()
+            embeddings.append(np.asarray(modelo.encode([pregunta]), dtype=np.float32)[0].tolist())
+            latencias["encode"].append((time.perf_counter() - inicio) * 1000)
+            inicio = time.perf_counter()
+            ids.append(chat_rag_local.recuperar_indices(pregunta, k))
+            latencias["recuperacion"].append((time.perf_counter() - inicio) * 1000)
+            inicio = time.perf_counter()
+            respuestas.append(chat_rag_local.responder_pregunta(pregunta))
+            latencias["respuesta"].append((time.perf_counter() - inicio) * 1000)
+
+    return {
+        "backend": chat_rag_local.RAG_BACKEND,
+        "carga_s": round(segundos_carga, 3),
+        "rss_mb": {"antes_de_cargar": rss_inicial, "tras_cargar": rss_carga, "pico": rss_pico_mb()},
+        "latencias": {etapa: resumen_latencias(np.array(valores)) for etapa, valores in latencias.items()},
+        "embeddings": embeddings,
+        "ids": ids,
+        "respuestas": respuestas,
+    }
+
+
+def ejecutar_backend(backend, args):
+    """Lanza un proceso nuevo con RAG_BACKEND=backend y las cachés desactivadas y devuelve sus mediciones"""
+    entorno = dict(
+        os.environ, RAG_BACKEND=backend, RAG_CACHE_EMBEDDINGS_MAX="0", RAG_CACHE_RESPUESTAS_MAX="0",
+        RAG_CACHE_SQLITE="", RAG_MICROLOTE_VENTANA_MS="0"
+    )
+    comando = [sys.executable, "-m", "benchmarks.paridad_backends_rag", "--hijo", "--k", str(args.k)]
+    salida = subprocess.run(comando, env=entorno, capture_output=True, text=True, check=True).stdout
+    linea = next(l for l in salida.splitlines() if l.startswith("RESULTADO "))
+    return json.loads(linea[len("RESULTADO "):])
+
+
+def f1_palabras(prediccion, referencia):
+    """F1 por palabras entre dos respuestas (1.0 si ambas están vacías)"""
+    pred, ref = prediccion.lower().split(), referencia.lower().split()
+    if not pred or not ref:
+        return float(pred == ref)
+    comunes = sum((Counter(pred) & Counter(ref)).values())
+    if comunes == 0:
+        return 0.0
+    precision, recall = comunes / len(pred), comunes / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def paridad(resultado, referencia):
+    """Compara las salidas de un backend con las del backend de referencia, pregunta por pregunta"""
+    a, b = np.array(resultado["embeddings"]), np.array(referencia["embeddings"])
+    coseno = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    solapamiento = [len(set(x) & set(y)) / max(len(y), 1) for x, y in zip(resultado["ids"], referencia["ids"])]
+    f1 = [f1_palabras(x, y) for x, y in zip(resultado["respuestas"], referencia["respuestas"])]
+    return {
+        "coseno_embeddings": {"media": round(float(coseno.mean()), 5), "min": round(float(coseno.min()), 5)},
+        "primer_chunk_igual": round(float(np.mean([x[:1] == y[:1] for x, y in zip(resultado["ids"], referencia["ids"])])), 4),
+        "solapamiento_chunks": round(float(np.mean(solapamiento)), 4),
+        "respuesta_exacta": round(float(np.mean([x == y for x, y in zip(resultado["respuestas"], referencia["respuestas"])])), 4),
+        "respuesta_f1": round(float(np.mean(f1)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridad, latencia y RSS de los backends de inferencia del RAG")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        help="El primero es la referencia para la paridad")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--min-coseno", type=float, default=0.98, help="Similitud coseno media mínima de los embeddings")
+    parser.add_argument("--min-f1", type=float, default=0.9, help="F1 medio mínimo de las respuestas")
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print("RESULTADO " + json.dumps(medir_backend(PREGUNTAS_RAG, args.k), ensure_ascii=False))
+        return
+
+    corridas = [ejecutar_backend(backend, args) for backend in args.backends]
+    referencia = corridas[0]
+    resultados = {"referencia": referencia["backend"], "preguntas": len(PREGUNTAS_RAG), "k": args.k, "backends": []}
+    fallos = []
+    for corrida in corridas:
+        resumen = {clave: corrida[clave] for clave in ("backend", "carga_s", "rss_mb", "latencias")}
+        if corrida is not referencia:
+            resumen["paridad"] = paridad(corrida, referencia)
+            if (resumen["paridad"]["coseno_embeddings"]["media"] < args.min_coseno
+                    or resumen["paridad"]["respuesta_f1"] < args.min_f1):
+                fallos.append(corrida["backend"])
+        resultados["backends"].append(resumen)
+    # Respuestas lado a lado para revisar a mano las diferencias
+    resultados["respuestas"] = [
+        {"pregunta": pregunta, **{c["backend"]: c["respuestas"][i] for c in corridas}}
+        for i, pregunta in enumerate(PREGUNTAS_RAG)
+    ]
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    if fallos:
+        print(f"⚠️ Sin paridad con {referencia['backend']}: {', '.join(fallos)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# ===============================
+# Suite de benchmarks de predicción y RAG
+# ===============================
+# Ejecuta de forma reproducible (semilla fija, calentamiento, mismos datos sintéticos) las mediciones de:
+# - pipeline: latencia de una fila y rendimiento por lotes (filas/s) del pipeline completo,
+# - transformadores: costo de cada paso del pipeline (PreprocessingTransformer, OneHotEncoderTransformer,
+#   ManualScaler, FeatureSelector y estimador) para una fila y para un lote,
+# - flask: latencia de punta a punta de /predict con el cliente de pruebas de Flask (sin caché),
+# - rag: latencia de recuperar_contexto y responder_pregunta contra el índice incluido (rag_index.faiss).
+# Los resultados se guardan en JSON junto con el commit y el entorno, y con --comparar se contrastan contra
+# una ejecución anterior: las métricas que empeoran más que la tolerancia, o que estaban en la ejecución anterior
+# y ya no se midieron, se informan y el proceso sale con código 1.
+#
+# Uso (desde la raíz del repositorio, con el modelo y el índice RAG presentes):
+#     python -m benchmarks.suite --salida benchmarks_base.json
+#     python -m benchmarks.suite --salida benchmarks_nuevo.json --comparar benchmarks_base.json --tolerancia 0.15
+#     python -m benchmarks.suite --solo pipeline transformadores
+#     python -m benchmarks.suite --autoverificacion
+
+# Importo las librerías necesarias
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+# Las cachés y los micro-lotes se desactivan para medir el costo real de cada petición
+# (deben fijarse antes de importar app / chat_rag_local)
+os.environ.setdefault("PREDICT_CACHE_MAX", "0")
+os.environ.setdefault("RAG_CACHE_EMBEDDINGS_MAX", "0")
+os.environ.setdefault("RAG_CACHE_RESPUESTAS_MAX", "0")
+os.environ.setdefault("RAG_MICROLOTE_VENTANA_MS", "0")
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from benchmarks.datos_sinteticos import generar_dataframe, generar_registros
+from benchmarks.medicion import medir_latencias, resumen_latencias, silenciar_stdout, PREGUNTAS_RAG
+
+BENCHMARKS = ("pipeline", "transformadores", "flask", "rag")
+
+
+def rendimiento(funcion, argumento, filas, repeticiones):
+    """Mejor tiempo de varias repeticiones, expresado en filas por segundo"""
+    funcion(argumento) # Calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return round(filas / min(tiempos), 1)
+
+
+def bench_pipeline(modelo, args):
+    """Latencia de una fila y rendimiento por lotes de modelo.predict_proba"""
+    registros = generar_registros(args.registros, semilla=args.semilla)
+    latencias = medir_latencias(lambda r: modelo.predict_proba(pd.DataFrame([r])), registros)
+    resultado = {"fila": resumen_latencias(latencias), "lotes": {}}
+    for tamano in args.tamanos_lote:
+        df = generar_dataframe(tamano, semilla=args.semilla)
+        resultado["lotes"][str(tamano)] = {
+            "filas_por_segundo": rendimiento(modelo.predict_proba, df, tamano, args.repeticiones)
+        }
+    return resultado
+
+
+def bench_transformadores(modelo, args):
+    """Costo de cada paso del pipeline, recorriéndolo manualmente (una fila y un lote)"""
+    pasos = [(type(paso).__name__, paso) for _, paso in modelo.steps if paso not in (None, "passthrough")]
+
+    def medir_pasos(df, repeticiones):
+        tiempos = {nombre: [] for nombre, _ in pasos}
+        for _ in range(repeticiones + 1): # La primera repetición es de calentamiento
+            X = df
+            for i, (nombre, paso) in enumerate(pasos):
+                inicio = time.perf_counter()
+                X = paso.predict_proba(X) if i == len(pasos) - 1 else paso.transform(X)
+                tiempos[nombre].append((time.perf_counter() - inicio) * 1000)
+        return {nombre: round(float(np.median(t[1:])), 4) for nombre, t in tiempos.items()}
+
+    lote = max(args.tamanos_lote)
+    return {
+        "fila_ms": medir_pasos(generar_dataframe(1, semilla=args.semilla), max(args.repeticiones, 50)),
+        f"lote_{lote}_ms": medir_pasos(generar_dataframe(lote, semilla=args.semilla), args.repeticiones),
+    }
+
+
+def bench_flask(args):
+    """Latencia de punta a punta de /predict a través del cliente de pruebas de Flask (caché desactivada)"""
+    import app as aplicacion
+    cliente = aplicacion.app.test_client()
+    registros = generar_registros(args.registros, semilla=args.semilla + 1)
+
+    def predecir(registro):
+        respuesta = cliente.post("/predict", json=registro)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"/predict respondió {respuesta.status_code}: {respuesta.get_json()}")
+
+    return {"predict": resumen_latencias(medir_latencias(predecir, registros))}
+
+
+def bench_rag(args):
+    """Latencia de recuperar_contexto (embeddings + FAISS) y de responder_pregunta (más QA) sin caché"""
+    import chat_rag_local
+    # Variantes numeradas de las preguntas para no repetir exactamente la misma consulta
+    preguntas = [f"{p} ({i})" for i in range(max(args.preguntas // len(PREGUNTAS_RAG), 1)) for p in PREGUNTAS_RAG]
+    return {
+        "recuperar_contexto": resumen_latencias(medir_latencias(chat_rag_local.recuperar_contexto, preguntas, 2)),
+        "responder_pregunta": resumen_latencias(medir_latencias(chat_rag_local.responder_pregunta, preguntas, 2)),
+    }
+
+
+def entorno():
+    """Datos del entorno para que los resultados de distintos commits sean comparables"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def aplanar(datos, prefijo=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}"""
+    plano = {}
+    for clave, valor in datos.items():
+        nombre = f"{prefijo}{clave}"
+        if isinstance(valor, dict):
+            plano.update(aplanar(valor, f"{nombre}."))
+        else:
+            plano[nombre] = valor
+    return plano
+
+
+def sentido(nombre):
+    """
+    "menor" si la métrica es una latencia (algún tramo de la ruta termina en _ms, como p50_ms o
+    transformadores.fila_ms.ManualScaler), "mayor" si es un rendimiento (filas_por_segundo) y None si no se compara
+    """
+    tramos = nombre.split(".")
+    if any(tramo.endswith("_ms") for tramo in tramos):
+        return "menor"
+    if tramos[-1] == "filas_por_segundo":
+        return "mayor"
+    return None
+
+
+def comparar(actual, base, tolerancia):
+    """
+    Compara las latencias y rendimientos de dos ejecuciones; devuelve las métricas que empeoran más que
+    la tolerancia (fracción) y las que estaban en la base pero no se midieron ahora (actual None),
+    p. ej. porque una sección falló y quedó omitida
+    """
+    actual, base = aplanar(actual["resultados"]), aplanar(base["resultados"])
+    regresiones = []
+    for nombre in sorted(base):
+        anterior, nuevo = base[nombre], actual.get(nombre)
+        direccion = sentido(nombre)
+        if direccion is None or not isinstance(anterior, (int, float)) or not anterior:
+            continue
+        if not isinstance(nuevo, (int, float)):
+            regresiones.append({"metrica": nombre, "base": anterior, "actual": None, "empeora": None})
+            continue
+        if direccion == "menor":
+            cambio = nuevo / anterior - 1
+        else:
+            cambio = anterior / nuevo - 1 if nuevo else float("inf")
+        if cambio > tolerancia:
+            regresiones.append({"metrica": nombre, "base": anterior, "actual": nuevo, "empeora": round(cambio, 4)})
+    return regresiones
+
+
+def autoverificacion():
+    """Comprueba que comparar detecta un transformador 5 veces más lento y una sección que dejó de medirse"""
+    base = {"resultados": {
+        "transformadores": {"fila_ms": {"ManualScaler": 1.0, "FeatureSelector": 1.0},
+                            "lote_10000_ms": {"ManualScaler": 10.0}},
+        "pipeline": {"lotes": {"1000": {"filas_por_segundo": 1000.0}}, "fila": {"n": 500, "p50_ms": 2.0}},
+        "rag": {"responder_pregunta": {"n": 30, "p50_ms": 100.0}},
+    }}
+    actual = {"resultados": {
+        "transformadores": {"fila_ms": {"ManualScaler": 5.0, "FeatureSelector": 1.05},
+                            "lote_10000_ms": {"ManualScaler": 50.0}},
+        "pipeline": {"lotes": {"1000": {"filas_por_segundo": 500.0}}, "fila": {"n": 100, "p50_ms": 2.1}},
+        "rag": {"omitido": "No existe rag_index.faiss"},
+    }}
+    regresiones = {r["metrica"]: r for r in comparar(actual, base, 0.15)}
+    assert set(regresiones) == {
+        "transformadores.fila_ms.ManualScaler", "transformadores.lote_10000_ms.ManualScaler",
+        "pipeline.lotes.1000.filas_por_segundo", "rag.responder_pregunta.p50_ms",
+    }, sorted(regresiones)
+    assert regresiones["transformadores.fila_ms.ManualScaler"]["empeora"] == 4.0
+    assert regresiones["rag.responder_pregunta.p50_ms"]["actual"] is None
+    assert comparar(base, base, 0.0) == []
+    print("✅ comparar detecta transformadores más lentos y métricas no medidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de predicción y RAG con detección de regresiones")
+    parser.add_argument("--modelo", default="pipeline_modelo_completo.pkl")
+    parser.add_argument("--solo", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--registros", type=int, default=500, help="Registros para las latencias por fila")
+    parser.add_argument("--tamanos-lote", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--preguntas", type=int, default=30, help="Preguntas para el benchmark RAG")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="resultados_benchmarks.json")
+    parser.add_argument("--comparar", default=None, help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Empeoramiento admitido (0.15 = 15%%)")
+    parser.add_argument("--autoverificacion", action="store_true",
+                        help="Sólo comprueba, con datos de ejemplo, que la detección de regresiones funciona")
+    args = parser.parse_args()
+    if args.autoverificacion:
+        autoverificacion()
+        return
+
+    resultados = {}
+    with silenciar_stdout():
+        if {"pipeline", "transformadores"} & set(args.solo):
+            modelo = joblib.load(args.modelo)
+        if "pipeline" in args.solo:
+            resultados["pipeline"] = bench_pipeline(modelo, args)
+        if "transformadores" in args.solo:
+            resultados["transformadores"] = bench_transformadores(modelo, args)
+        if "flask" in args.solo:
+            resultados["flask"] = bench_flask(args)
+        if "rag" in args.solo:
+            try:
+                resultados["rag"] = bench_rag(args)
+            except (OSError, ImportError, RuntimeError) as e:
+                # Sin el índice o sin los modelos de RAG el resto de la suite sigue siendo útil
+                resultados["rag"] = {"omitido": str(e)}
+
+    informe = {"entorno": entorno(), "parametros": vars(args), "resultados": resultados}
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        # Sólo se comparan las secciones ejecutadas ahora (--solo); dentro de ellas, lo que falte cuenta como regresión
+        base_secciones = {"resultados": {k: v for k, v in base["resultados"].items() if k in args.solo}}
+        regresiones = comparar(informe, base_secciones, args.tolerancia)
+        print(f"Comparación con {args.comparar} (commit {base['entorno'].get('commit')}, tolerancia {args.tolerancia:.0%}):")
+        for r in regresiones:
+            if r["actual"] is None:
+                print(f"  ⚠️ {r['metrica']}: {r['base']} -> no medida")
+            else:
+                print(f"  ⚠️ {r['metrica']}: {r['base']} -> {r['actual']} (empeora {r['empeora']:.1%})")
+        if regresiones:
+            sys.exit(1)
+        print("  ✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,34 @@
 import os
 import json
+import bisect
+import uuid
+import hashlib
+import argparse
 import faiss
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from PyPDF2 import PdfReader  
+from concurrent.futures import ProcessPoolExecutor
+from almacen_chunks import escribir_almacen, escribir_generacion
+from fragmentacion import fragmentar_paginas, contador_tokens
+from indices_rag import (construir_indice, preparar_vectores, motivo_reentrenamiento, CONFIG_POR_DEFECTO,
+                         TIPOS_INDICE, METRICAS)
 
 # ============================
 # CONFIG
 # ============================
 # Rutas y parámetros principales
-PDF_PATH = "TFM_Mauro_Alexis_Fernandez.pdf" # PDF origen para construir el índice
-CHUNK_SIZE = 700 # Cantidad de caracteres por fragmento (chunk)
+PDF_PATH = "TFM_Mauro_Alexis_Fernandez.pdf" # PDF (o directorio de PDFs) origen para construir el índice
+CHUNKER = "tokens" # "tokens": oraciones agrupadas por tokens del modelo; "caracteres": corte fijo (anterior)
+SOLAPAMIENTO_TOKENS = 24 # Tokens de las últimas oraciones que se repiten en el chunk siguiente
+CHUNK_SIZE = 700 # Cantidad de caracteres por fragmento (chunk) con el chunker por caracteres
 CHUNK_OVERLAP = 100 # Superposición entre fragmentos para no perder contexto
 INDEX_NAME = "rag_index.faiss" # Nombre del archivo donde se guardará el índice FAISS
-METADATA_NAME = "rag_metadata.json"  # Archivo para guardar texto de cada chunk
+METADATA_NAME = "rag_metadata.json"  # Configuración del índice y nombres de los documentos
+CHUNKS_NAME = "rag_chunks" # Almacén binario con el texto de cada chunk (rag_chunks.bin + rag_chunks.npy)
+MANIFEST_NAME = "rag_manifest.json" # Hash de contenido de cada documento indexado y los chunks que generó
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2" # Modelo de embeddings
+EMBEDDING_BATCH = 64 # Chunks por lote de embeddings
+MAX_ELIMINADOS = 0.3 # Fracción de chunks eliminados a partir de la cual se reconstruye el índice completo
 
 # ============================
 # FUNCIONES
@@ -34,36 +47,232 @@ def smart_chunk(text, chunk_size=700, overlap=100):
         start += chunk_size - overlap
     return chunks
 
-def extract_chunks_from_pdf(path):
+def extraer_paginas(path):
+    """Extrae el texto de cada página de un PDF (se ejecuta en un proceso del pool)"""
+    from PyPDF2 import PdfReader
     reader = PdfReader(path)
-    full_text = ""
-    for page in reader.pages:
-         # Concatena texto de cada página
-        full_text += page.extract_text() + "\n"
-    return smart_chunk(full_text)
+    return [page.extract_text() or "" for page in reader.pages]
+
+def chunks_con_paginas(paginas, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Une las páginas (con join, sin concatenar cadenas en un bucle) y las divide en chunks.
+    Devuelve los chunks y la página (1..n) en la que empieza cada uno.
+    """
+    full_text = "".join(pagina + "\n" for pagina in paginas)
+    # Posición en el texto completo donde empieza cada página
+    inicios, posicion = [], 0
+    for pagina in paginas:
+        inicios.append(posicion)
+        posicion += len(pagina) + 1
+    chunks = smart_chunk(full_text, chunk_size, overlap)
+    paso = chunk_size - overlap
+    paginas_chunk = [bisect.bisect_right(inicios, i * paso) for i in range(len(chunks))]
+    return chunks, paginas_chunk
+
+def hash_archivo(path):
+    """Hash SHA-256 del contenido del archivo (detecta documentos nuevos o modificados)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+def listar_pdfs(origen):
+    """PDFs a indexar: el archivo indicado o todos los PDF de un directorio (recursivo), con su nombre relativo"""
+    origen = Path(origen)
+    if origen.is_dir():
+        return {str(p.relative_to(origen)): p for p in sorted(origen.rglob("*.pdf"))}
+    return {origen.name: origen}
+
+def leer_json(path, defecto):
+    if not os.path.exists(path):
+        return defecto
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def escribir_json(path, datos, indent=None, reemplazos=None):
+    """
+    Escritura atómica: se escribe a un temporal y se reemplaza, así un lector nunca ve un archivo a medias.
+    Con la lista reemplazos, el par (temporal, destino) se agrega a ella en lugar de reemplazar en el momento
+    """
+    temporal = f"{path}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=indent)
+    if reemplazos is None:
+        os.replace(temporal, path)
+    else:
+        reemplazos.append((temporal, path))
+
+def extraer_documentos(rutas, procesos):
+    """Extrae el texto de las páginas de cada PDF en un pool de procesos"""
+    print(f"📄 Extrayendo texto de {len(rutas)} PDF/s con {procesos} proceso/s...")
+    with ProcessPoolExecutor(max_workers=max(1, procesos)) as pool:
+        return list(pool.map(extraer_paginas, [str(ruta) for ruta in rutas]))
+
+def generar_embeddings(model, textos, lote):
+    """Genera los embeddings por lotes de tamaño fijo"""
+    partes = []
+    for inicio in range(0, len(textos), lote):
+        partes.append(np.asarray(model.encode(textos[inicio:inicio + lote], batch_size=lote), dtype=np.float32))
+        print(f"   🔢 {min(inicio + lote, len(textos))}/{len(textos)} chunks")
+    return np.vstack(partes) if partes else np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+def parse_args():
+    """Opciones del origen de documentos y del tipo de índice (por defecto, índice plano L2 como el original)"""
+    parser = argparse.ArgumentParser(description="Construye o actualiza el índice RAG (FAISS + metadatos) a partir de PDFs")
+    parser.add_argument("--pdfs", "--pdf", dest="pdfs", default=PDF_PATH, help="PDF o directorio con PDFs")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos para extraer el texto")
+    parser.add_argument("--lote-embeddings", type=int, default=EMBEDDING_BATCH)
+    parser.add_argument("--chunker", choices=("tokens", "caracteres"), default=CHUNKER)
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Tokens por chunk (por defecto, el máximo que codifica el modelo de embeddings)")
+    parser.add_argument("--solapamiento-tokens", type=int, default=SOLAPAMIENTO_TOKENS)
+    parser.add_argument("--reconstruir", action="store_true", help="Ignora el manifiesto y reconstruye todo")
+    parser.add_argument("--tipo-indice", choices=TIPOS_INDICE, default=CONFIG_POR_DEFECTO["tipo"])
+    parser.add_argument("--metrica", choices=METRICAS, default=CONFIG_POR_DEFECTO["metrica"],
+                        help="l2, o ip = producto interno sobre embeddings normalizados (coseno)")
+    parser.add_argument("--nlist", type=int, default=CONFIG_POR_DEFECTO["nlist"], help="IVF: cantidad de listas")
+    parser.add_argument("--nprobe", type=int, default=CONFIG_POR_DEFECTO["nprobe"], help="IVF: listas visitadas por búsqueda")
+    parser.add_argument("--pq-m", type=int, default=CONFIG_POR_DEFECTO["pq_m"], help="PQ: subcuantizadores")
+    parser.add_argument("--pq-bits", type=int, default=CONFIG_POR_DEFECTO["pq_bits"], help="PQ: bits por subcuantizador")
+    parser.add_argument("--hnsw-m", type=int, default=CONFIG_POR_DEFECTO["hnsw_m"], help="HNSW: vecinos por nodo")
+    parser.add_argument("--ef-construction", type=int, default=CONFIG_POR_DEFECTO["ef_construction"])
+    parser.add_argument("--ef-search", type=int, default=CONFIG_POR_DEFECTO["ef_search"])
+    return parser.parse_args()
 
 # ============================
 # MAIN
 # ============================
-print("✅ Cargando modelo de embeddings...")
-model = SentenceTransformer(MODEL_NAME) # Carga el modelo de transformadores para embeddings
+def main():
+    args = parse_args()
+    opciones_indice = dict(
+        tipo=args.tipo_indice, metrica=args.metrica, nlist=args.nlist, nprobe=args.nprobe,
+        pq_m=args.pq_m, pq_bits=args.pq_bits, hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction, ef_search=args.ef_search
+    )
+    # Todo lo que cambia el contenido del índice: si difiere del manifiesto hay que reconstruir
+    if args.chunker == "tokens":
+        fragmentacion = {"chunker": "tokens", "max_tokens": args.max_tokens, "solapamiento_tokens": args.solapamiento_tokens}
+    else:
+        fragmentacion = {"chunker": "caracteres", "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    configuracion = {"modelo": MODEL_NAME, "fragmentacion": fragmentacion, "indice": opciones_indice}
+
+    print("📂 Buscando documentos y calculando hashes...")
+    pdfs = listar_pdfs(args.pdfs)
+    hashes = {nombre: hash_archivo(ruta) for nombre, ruta in pdfs.items()}
+
+    manifiesto = leer_json(MANIFEST_NAME, None)
+    metadatos = leer_json(METADATA_NAME, None)
+    incremental = (not args.reconstruir and manifiesto is not None and metadatos is not None
+                   and "almacen" in metadatos and os.path.exists(INDEX_NAME) and os.path.exists(f"{CHUNKS_NAME}.npy")
+                   and manifiesto.get("configuracion") == configuracion
+                   # Un índice vacío construido como plano en lugar del tipo pedido se reconstruye al llegar documentos
+                   and "tipo_solicitado" not in metadatos.get("indice", {}))
+    if not incremental:
+        manifiesto = {"configuracion": configuracion, "documentos": {}}
+        metadatos = {"almacen": CHUNKS_NAME, "documentos": [], "total": 0, "eliminados": 0}
+
+    # Los chunks de documentos modificados o eliminados se marcan como borrados (el chat los ignora)
+    documentos = manifiesto["documentos"]
+    nuevos = [n for n in pdfs if documentos.get(n, {}).get("sha256") != hashes[n]]
+    quitados = [n for n in documentos if n not in pdfs or n in nuevos]
+    borrar = [i for nombre in quitados for i in documentos.pop(nombre)["chunks"]]
+    if incremental and metadatos["eliminados"] + len(borrar) > MAX_ELIMINADOS * metadatos["total"]:
+        # Demasiados huecos degradan la búsqueda (hay que pedir más vecinos): se reconstruye todo
+        print("♻️ Demasiados chunks eliminados: se reconstruye el índice completo")
+        incremental = False
+        manifiesto = {"configuracion": configuracion, "documentos": {}}
+        metadatos = {"almacen": CHUNKS_NAME, "documentos": [], "total": 0, "eliminados": 0}
+        documentos, nuevos, borrar = manifiesto["documentos"], list(pdfs), []
+    print(f"📄 {len(pdfs)} documentos: {len(nuevos)} a procesar, {len(quitados)} con chunks eliminados")
+
+    if not nuevos and not quitados:
+        print("✅ El índice ya está al día, no hay nada que hacer.")
+        return
+
+    paginas_por_doc = dict(zip(nuevos, extraer_documentos([pdfs[n] for n in nuevos], args.procesos)))
+
+    print("✅ Cargando modelo de embeddings...")
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME) # Carga el modelo de transformadores para embeddings
+
+    if args.chunker == "tokens":
+        # Chunks medidos con el tokenizer del propio modelo: por defecto, lo que codifica sin truncar
+        # (max_seq_length menos los tokens especiales [CLS] y [SEP])
+        max_tokens = args.max_tokens or model.max_seq_length - 2
+        contar = contador_tokens(model.tokenizer)
+        fragmentar = lambda paginas: fragmentar_paginas(paginas, contar, max_tokens, args.solapamiento_tokens)
+    else:
+        fragmentar = chunks_con_paginas
+
+    def fragmentar_documentos():
+        """Chunks de los documentos a procesar, numerados a continuación de los que ya tiene el índice"""
+        textos, fuentes = [], []
+        for nombre in nuevos:
+            paginas = paginas_por_doc[nombre]
+            textos_doc, paginas_chunk = fragmentar(paginas)
+            inicio = metadatos["total"] + len(textos)
+            documentos[nombre] = {"sha256": hashes[nombre], "paginas": len(paginas),
+                                  "chunks": list(range(inicio, inicio + len(textos_doc)))}
+            textos.extend(textos_doc)
+            fuentes.extend((nombre, p) for p in paginas_chunk)
+        return textos, fuentes
 
-print("📄 Extrayendo y dividiendo texto del PDF...")
-chunks = extract_chunks_from_pdf(PDF_PATH) # Lee y chunkifica el PDF
-print(f"✂️ Total de chunks generados desde el PDF: {len(chunks)}")
+    textos, fuentes = fragmentar_documentos()
+    if incremental:
+        # Un IVF / PQ conserva el entrenamiento del primer corpus (y el nlist / pq_bits reducidos si era pequeño):
+        # si el corpus creció mucho o ya alcanza para los parámetros pedidos, se reconstruye y se reentrena
+        vigentes = metadatos["total"] - metadatos["eliminados"] - len(borrar) + len(textos)
+        motivo = motivo_reentrenamiento(metadatos["indice"], vigentes, **opciones_indice)
+        if motivo:
+            print(f"♻️ Se reentrena el índice ({motivo}): se reconstruye el índice completo")
+            incremental = False
+            manifiesto = {"configuracion": configuracion, "documentos": {}}
+            metadatos = {"almacen": CHUNKS_NAME, "documentos": [], "total": 0, "eliminados": 0}
+            documentos, borrar = manifiesto["documentos"], []
+            restantes = [n for n in pdfs if n not in paginas_por_doc]
+            paginas_por_doc.update(zip(restantes, extraer_documentos([pdfs[n] for n in restantes], args.procesos)))
+            nuevos = list(pdfs)
+            textos, fuentes = fragmentar_documentos()
+    print(f"✂️ Total de chunks nuevos: {len(textos)}")
 
-print("🔢 Generando embeddings...")
-embeddings = model.encode(chunks, show_progress_bar=True) # Convierte cada chunk a un vector
+    print("🔢 Generando embeddings...")
+    embeddings = generar_embeddings(model, textos, args.lote_embeddings)
 
+    if incremental:
+        # Se agregan los vectores nuevos al índice existente (ya entrenado), sin recalcular los anteriores
+        index = faiss.read_index(INDEX_NAME)
+        if len(embeddings):
+            index.add(preparar_vectores(embeddings, metadatos["indice"]["metrica"]))
+    else:
+        # Crea, entrena si hace falta y llena el índice del tipo elegido
+        index, metadatos["indice"] = construir_indice(embeddings, **opciones_indice)
+        if "tipo_solicitado" in metadatos["indice"]:
+            print(f"⚠️ No hay chunks para entrenar un índice {args.tipo_indice}: se crea un índice plano")
 
-print("💾 Guardando índice FAISS y metadatos...")
-d = embeddings.shape[1]  # Dimensión de los vectores
-index = faiss.IndexFlatL2(d) # Crea índice plano (L2)
-index.add(np.array(embeddings))  # Agrega todos los vectores al índice
-faiss.write_index(index, INDEX_NAME) # Guarda índice en disco
+    print("💾 Guardando índice FAISS, chunks, metadatos y manifiesto...")
+    # Todos los archivos se escriben primero a temporales y recién después se reemplazan, en este orden:
+    # generación, índice, almacén de chunks y, al final, los metadatos. Cada construcción tiene una generación
+    # nueva que se guarda junto al almacén y en los metadatos: el chat la lee después del índice y del almacén,
+    # así detecta un conjunto a medio reemplazar (aunque el total de chunks no cambie) y vuelve a leerlo
+    reemplazos = []
+    metadatos["generacion"] = uuid.uuid4().hex
+    escribir_generacion(CHUNKS_NAME, metadatos["generacion"], reemplazos)
+    faiss.write_index(index, f"{INDEX_NAME}.tmp") # Guarda índice en disco
+    reemplazos.append((f"{INDEX_NAME}.tmp", INDEX_NAME))
+    # El texto de cada chunk (con su documento y página) va al almacén binario; los metadatos guardan
+    # los nombres de los documentos y la configuración del índice, para que el chat lo abra con la misma
+    # métrica y los mismos parámetros de búsqueda
+    metadatos["documentos"] = escribir_almacen(CHUNKS_NAME, textos, fuentes, metadatos["documentos"],
+                                               eliminar=borrar, anexar=incremental, reemplazos=reemplazos)
+    metadatos["total"] += len(textos)
+    metadatos["eliminados"] += len(borrar)
+    escribir_json(METADATA_NAME, metadatos, indent=2, reemplazos=reemplazos)
+    escribir_json(MANIFEST_NAME, manifiesto, indent=2, reemplazos=reemplazos)
+    for temporal, destino in reemplazos:
+        os.replace(temporal, destino)
 
-# Guarda también el texto original de cada chunk para referencia
-with open(METADATA_NAME, "w", encoding="utf-8") as f:
-    json.dump({"chunks": chunks}, f, ensure_ascii=False, indent=2)
+    print(f"✅ ¡Índice RAG actualizado! ({index.ntotal} vectores, {metadatos['eliminados']} marcados como eliminados)")
 
-print("✅ ¡Índice RAG creado con éxito desde el PDF!")
+if __name__ == "__main__":
+    main()
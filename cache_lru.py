@@ -0,0 +1,79 @@
+# ===============================
+# Caché LRU con expiración por TTL
+# ===============================
+# Caché en memoria de tamaño acotado y segura entre hilos (Waitress atiende las peticiones con un pool de hilos).
+# Cuando se llena expulsa la entrada usada hace más tiempo (LRU) y, si se configura un TTL,
+# descarta las entradas más antiguas que ese tiempo. Lleva contadores de aciertos y fallos para los operadores.
+
+# Importo las librerías necesarias
+import time
+import threading
+from collections import OrderedDict
+
+# Valor centinela para distinguir "no está en caché" de un valor guardado
+_AUSENTE = object()
+
+
+class CacheLRU:
+    def __init__(self, max_entradas=10000, ttl=None):
+        # Cantidad máxima de entradas (0 desactiva la caché) y vida máxima de cada entrada en segundos (None = sin TTL)
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict() # clave -> (valor, instante de guardado)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiraciones = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, defecto=None):
+        """Devuelve el valor guardado para la clave (y lo marca como usado recientemente) o 'defecto' si no está o expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave, _AUSENTE)
+            if entrada is not _AUSENTE and self.ttl is not None and time.monotonic() - entrada[1] > self.ttl:
+                del self._datos[clave]
+                self.expiraciones += 1
+                entrada = _AUSENTE
+            if entrada is _AUSENTE:
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor):
+        """Guarda el valor y expulsa la entrada menos usada si se supera el tamaño máximo"""
+        if self.max_entradas <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic())
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self):
+        """Vacía la caché (p. ej. cuando cambia el modelo)"""
+        with self._lock:
+            self._datos.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "expulsiones": self.expulsiones,
+                "expiraciones": self.expiraciones,
+                "invalidaciones": self.invalidaciones,
+            }
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,128 @@
+# ===============================
+# Caché de dos niveles para el sistema RAG
+# ===============================
+# Nivel 1: texto normalizado de la pregunta -> embedding (evita volver a ejecutar SentenceTransformer).
+# Nivel 2: (pregunta, ids de los chunks recuperados) -> respuesta del modelo de QA (evita volver a ejecutar BERT).
+# Cada nivel es una caché LRU en memoria acotada y, opcionalmente, se respalda en SQLite
+# para que un worker que se reinicia (o los demás procesos) arranquen con la caché ya poblada.
+
+# Importo las librerías necesarias
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from cache_lru import CacheLRU
+
+
+def normalizar_pregunta(pregunta):
+    """Normaliza la pregunta (Unicode NFKC y espacios colapsados) para que variantes triviales compartan caché"""
+    return " ".join(unicodedata.normalize("NFKC", pregunta).split())
+
+
+class AlmacenSQLite:
+    """Almacén clave -> bytes en una tabla SQLite, acotado a max_entradas (expulsa las usadas hace más tiempo)"""
+
+    def __init__(self, ruta, tabla, max_entradas):
+        self.tabla = tabla
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._escrituras = 0
+        # Una conexión compartida entre hilos (protegida por el lock); WAL permite lectores de otros procesos
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} (clave TEXT PRIMARY KEY, valor BLOB NOT NULL, ultimo_uso REAL NOT NULL)"
+        )
+        self._conexion.commit()
+
+    def obtener(self, clave):
+        with self._lock:
+            fila = self._conexion.execute(f"SELECT valor FROM {self.tabla} WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            self._conexion.execute(f"UPDATE {self.tabla} SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+            self._conexion.commit()
+            return fila[0]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._conexion.execute(
+                f"INSERT OR REPLACE INTO {self.tabla} (clave, valor, ultimo_uso) VALUES (?, ?, ?)",
+                (clave, valor, time.time())
+            )
+            # El recorte por tamaño se hace cada 100 escrituras para no recorrer la tabla en cada inserción
+            self._escrituras += 1
+            if self._escrituras % 100 == 0:
+                self._conexion.execute(
+                    f"DELETE FROM {self.tabla} WHERE clave IN (SELECT clave FROM {self.tabla} "
+                    f"ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?)", (self.max_entradas,)
+                )
+            self._conexion.commit()
+
+
+class CacheRAG:
+    def __init__(self, modelo_embeddings, modelo_qa, version_indice="", max_embeddings=5000,
+                 max_respuestas=5000, ruta_sqlite=None):
+        # Los nombres de los modelos y la versión del índice forman parte de las claves:
+        # si cambia cualquiera de ellos, las entradas antiguas dejan de usarse
+        self._prefijo_embeddings = modelo_embeddings
+        self._prefijo_respuestas = f"{modelo_embeddings}|{modelo_qa}|{version_indice}"
+        self.embeddings = CacheLRU(max_embeddings)
+        self.respuestas = CacheLRU(max_respuestas)
+        self._disco_embeddings = self._disco_respuestas = None
+        self.aciertos_disco = {"embeddings": 0, "respuestas": 0} # Fallos en memoria resueltos desde SQLite
+        if ruta_sqlite:
+            self._disco_embeddings = AlmacenSQLite(ruta_sqlite, "embeddings", max_embeddings)
+            self._disco_respuestas = AlmacenSQLite(ruta_sqlite, "respuestas", max_respuestas)
+
+    def _clave(self, *partes):
+        texto = json.dumps(partes, ensure_ascii=False)
+        return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+    def obtener_embedding(self, pregunta):
+        """Embedding de la pregunta normalizada o None si no está en caché (memoria y luego disco)"""
+        clave = self._clave(self._prefijo_embeddings, pregunta)
+        embedding = self.embeddings.obtener(clave)
+        if embedding is None and self._disco_embeddings is not None:
+            valor = self._disco_embeddings.obtener(clave)
+            if valor is not None:
+                embedding = np.frombuffer(valor, dtype=np.float32)
+                self.aciertos_disco["embeddings"] += 1
+                self.embeddings.guardar(clave, embedding)
+        return embedding
+
+    def guardar_embedding(self, pregunta, embedding):
+        clave = self._clave(self._prefijo_embeddings, pregunta)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self.embeddings.guardar(clave, embedding)
+        if self._disco_embeddings is not None:
+            self._disco_embeddings.guardar(clave, embedding.tobytes())
+
+    def obtener_respuesta(self, pregunta, ids_chunks):
+        """Respuesta de QA para la pregunta y los chunks recuperados o None si no está en caché"""
+        clave = self._clave(self._prefijo_respuestas, pregunta, [int(i) for i in ids_chunks])
+        respuesta = self.respuestas.obtener(clave)
+        if respuesta is None and self._disco_respuestas is not None:
+            valor = self._disco_respuestas.obtener(clave)
+            if valor is not None:
+                respuesta = valor.decode("utf-8")
+                self.aciertos_disco["respuestas"] += 1
+                self.respuestas.guardar(clave, respuesta)
+        return respuesta
+
+    def guardar_respuesta(self, pregunta, ids_chunks, respuesta):
+        clave = self._clave(self._prefijo_respuestas, pregunta, [int(i) for i in ids_chunks])
+        self.respuestas.guardar(clave, respuesta)
+        if self._disco_respuestas is not None:
+            self._disco_respuestas.guardar(clave, respuesta.encode("utf-8"))
+
+    def estadisticas(self):
+        return {
+            "embeddings": self.embeddings.estadisticas(),
+            "respuestas": self.respuestas.estadisticas(),
+            "sqlite": self._disco_embeddings is not None,
+            "aciertos_sqlite": dict(self.aciertos_disco),
+        }
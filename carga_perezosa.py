@@ -0,0 +1,77 @@
+# ===============================
+# Carga perezosa de modelos
+# ===============================
+# Cada subsistema (pipeline de predicción, modelo de embeddings, modelo de QA, índice RAG) se carga la primera vez
+# que se necesita y no al importar el módulo: un proceso que sólo atiende /predict no paga la carga de BERT.
+# La carga es segura entre hilos (se ejecuta una sola vez aunque lleguen varias peticiones a la vez), puede
+# lanzarse en segundo plano para precalentar el proceso y registra su duración y su error para /readyz.
+
+# Importo las librerías necesarias
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CargaPerezosa:
+    def __init__(self, nombre, funcion_carga):
+        # funcion_carga no recibe argumentos y devuelve el objeto cargado
+        self.nombre = nombre
+        self.funcion_carga = funcion_carga
+        self._valor = None
+        self._cargado = False
+        self._lock = threading.Lock()
+        self.segundos = None # Duración de la última carga
+        self.error = None # Último error de carga (se reintenta en la siguiente llamada)
+
+    @property
+    def cargado(self):
+        return self._cargado
+
+    def obtener(self):
+        """Devuelve el objeto, cargándolo si todavía no se cargó (los demás hilos esperan a esa misma carga)"""
+        if self._cargado:
+            return self._valor
+        with self._lock:
+            if not self._cargado:
+                self._valor = self._cargar()
+                self._cargado = True
+        return self._valor
+
+    def recargar(self):
+        """Vuelve a cargar el objeto y lo reemplaza; mientras tanto las peticiones siguen usando el anterior"""
+        with self._lock:
+            self._valor = self._cargar()
+            self._cargado = True
+        return self._valor
+
+    def _cargar(self):
+        inicio = time.perf_counter()
+        try:
+            valor = self.funcion_carga()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        self.segundos = time.perf_counter() - inicio
+        self.error = None
+        logger.info(f"Subsistema '{self.nombre}' cargado en {self.segundos:.2f}s")
+        return valor
+
+    def precargar(self):
+        """Inicia la carga en un hilo de fondo (precalentamiento); los errores quedan registrados en 'error'"""
+        def tarea():
+            try:
+                self.obtener()
+            except Exception:
+                logger.exception(f"Falló la precarga del subsistema '{self.nombre}'")
+        hilo = threading.Thread(target=tarea, name=f"precarga-{self.nombre}", daemon=True)
+        hilo.start()
+        return hilo
+
+    def estado(self):
+        return {
+            "cargado": self._cargado,
+            "segundos_carga": round(self.segundos, 3) if self.segundos is not None else None,
+            "error": self.error,
+        }
@@ -1,12 +1,14 @@
 import json
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
-import torch
 import os
-from transformers import logging
-logging.set_verbosity_info()
+import time
+from types import SimpleNamespace
+from cache_rag import CacheRAG, normalizar_pregunta
+from microlotes import Microlotes
+from indices_rag import configurar_busqueda, preparar_vectores, leer_indice
+from almacen_chunks import AlmacenChunks
+from carga_perezosa import CargaPerezosa
+import metricas
 
 # ========================
 # CONFIG
@@ -16,63 +18,264 @@ logging.set_verbosity_info()
 # - QA_MODEL: modelo extractivo para responder preguntas en español a partir de un contexto.
 EMBED_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 QA_MODEL = "mrm8488/bert-base-spanish-wwm-cased-finetuned-spa-squad2-es"  # modelo extractivo en español
+INDEX_PATH = "rag_index.faiss"
+METADATA_PATH = "rag_metadata.json"
+
+# Caché de embeddings y respuestas: tamaño de cada nivel en memoria y archivo SQLite opcional para persistirla
+RAG_CACHE_EMBEDDINGS_MAX = int(os.environ.get("RAG_CACHE_EMBEDDINGS_MAX", 5000))
+RAG_CACHE_RESPUESTAS_MAX = int(os.environ.get("RAG_CACHE_RESPUESTAS_MAX", 5000))
+RAG_CACHE_SQLITE = os.environ.get("RAG_CACHE_SQLITE", "") # p. ej. "rag_cache.sqlite" (vacío = sólo en memoria)
+
+# Micro-lotes: las preguntas concurrentes que llegan dentro de la ventana (ms) se procesan juntas,
+# hasta RAG_MICROLOTE_MAX por lote (RAG_MICROLOTE_VENTANA_MS=0 desactiva el agrupamiento)
+RAG_MICROLOTE_VENTANA_MS = float(os.environ.get("RAG_MICROLOTE_VENTANA_MS", 10))
+RAG_MICROLOTE_MAX = int(os.environ.get("RAG_MICROLOTE_MAX", 8))
+
+# Índice FAISS mapeado en memoria (RAG_INDICE_MMAP=0 lo carga completo en la memoria de cada proceso)
+RAG_INDICE_MMAP = os.environ.get("RAG_INDICE_MMAP", "1") != "0"
+
+# Backend de inferencia de los modelos de embeddings y de QA (RAG_BACKEND):
+# - "torch": modelos originales de PyTorch en precisión completa,
+# - "onnx": modelos exportados a ONNX y ejecutados con ONNX Runtime,
+# - "onnx-int8": modelos ONNX con cuantización dinámica a int8 (menos memoria y más rápidos en CPU).
+# Los modelos ONNX se generan offline con exportar_modelos_rag.py en RAG_MODELOS_ONNX/embeddings y RAG_MODELOS_ONNX/qa
+BACKENDS_RAG = ("torch", "onnx", "onnx-int8")
+ARCHIVOS_ONNX = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"} # Archivo de cada backend en cada carpeta
+RAG_BACKEND = os.environ.get("RAG_BACKEND", "torch")
+RAG_MODELOS_ONNX = os.environ.get("RAG_MODELOS_ONNX", "modelos_onnx")
+if RAG_BACKEND not in BACKENDS_RAG:
+    raise ValueError(f"RAG_BACKEND debe ser uno de {BACKENDS_RAG} (se recibió {RAG_BACKEND!r})")
+
+# Los modelos y el índice no se cargan al importar el módulo sino en la primera pregunta
+# (o antes, en segundo plano, con precargar()). torch, transformers y sentence_transformers
+# también se importan dentro de las funciones de carga porque sólo importarlos ya tarda varios segundos.
+
+def _ruta_onnx(modelo):
+    """Carpeta del modelo exportado ("embeddings" o "qa") para los backends ONNX"""
+    ruta = os.path.join(RAG_MODELOS_ONNX, modelo)
+    if not os.path.isdir(ruta):
+        raise FileNotFoundError(f"No existe {ruta}: exportar los modelos con python exportar_modelos_rag.py")
+    return ruta
 
 # ========================
 # CARGA DE EMBEDDINGS
 # ========================
-print("🔍 Cargando modelo de embeddings...")
-embedding_model = SentenceTransformer(
-    EMBED_MODEL,
-    device='cuda' if torch.cuda.is_available() else 'cpu' # Usa GPU si está disponible
-)
-print("✅ Embeddings cargados")
+def _cargar_embeddings():
+    from sentence_transformers import SentenceTransformer
+    print(f"🔍 Cargando modelo de embeddings ({RAG_BACKEND})...")
+    if RAG_BACKEND == "torch":
+        import torch
+        modelo = SentenceTransformer(
+            EMBED_MODEL,
+            device='cuda' if torch.cuda.is_available() else 'cpu' # Usa GPU si está disponible
+        )
+    else:
+        # sentence_transformers guarda el modelo ONNX en la subcarpeta onnx/ (requiere optimum y onnxruntime)
+        modelo = SentenceTransformer(
+            _ruta_onnx("embeddings"),
+            backend="onnx",
+            device="cpu",
+            model_kwargs={"file_name": f"onnx/{ARCHIVOS_ONNX[RAG_BACKEND]}"}
+        )
+    print("✅ Embeddings cargados")
+    return modelo
 
 # ========================
 # CARGA DEL MODELO QA
 # ========================
-print(f"🤖 Cargando modelo de QA: {QA_MODEL}...")
-qa_pipeline = pipeline(
-    "question-answering", # Pipeline de preguntas y respuestas (extractivo)
-    model=QA_MODEL,
-    tokenizer=QA_MODEL
-)
-print("✅ Pipeline QA listo")
+def _cargar_qa():
+    from transformers import pipeline
+    print(f"🤖 Cargando modelo de QA: {QA_MODEL} ({RAG_BACKEND})...")
+    if RAG_BACKEND == "torch":
+        modelo = tokenizer = QA_MODEL
+    else:
+        # El modelo ONNX de optimum se usa con el mismo pipeline de transformers (mismo pre y posprocesamiento)
+        from transformers import AutoTokenizer
+        from optimum.onnxruntime import ORTModelForQuestionAnswering
+        ruta = _ruta_onnx("qa")
+        modelo = ORTModelForQuestionAnswering.from_pretrained(ruta, file_name=ARCHIVOS_ONNX[RAG_BACKEND])
+        tokenizer = AutoTokenizer.from_pretrained(ruta)
+    qa = pipeline(
+        "question-answering", # Pipeline de preguntas y respuestas (extractivo)
+        model=modelo,
+        tokenizer=tokenizer
+    )
+    print("✅ Pipeline QA listo")
+    return qa
 
 # ========================
 # CARGA DEL ÍNDICE RAG
 # ========================
-# Lee el índice FAISS generado previamente y los metadatos (texto chunkificado)
-print("📚 Cargando índice RAG...")
-index = faiss.read_index("rag_index.faiss")
-with open("rag_metadata.json", "r", encoding="utf-8") as f:
-    metadatos_json = json.load(f)
-chunks = metadatos_json.get("chunks", [])
-print(f"✅ Índice y metadatos cargados ({len(chunks)} chunks)")
+def _leer_archivos_indice(intentos=20, espera=0.25):
+    """
+    Lee los metadatos, el índice FAISS y el almacén de chunks, y comprueba que correspondan a la misma
+    versión: build_rag_index.py reemplaza la generación del almacén, el índice, el almacén y por último
+    los metadatos, de modo que si se lee durante una actualización la generación (o, en índices anteriores,
+    el total de chunks) de los metadatos no coincide con la del almacén y se vuelve a leer
+    """
+    for intento in range(intentos):
+        with open(METADATA_PATH, "r", encoding="utf-8") as f:
+            metadatos_json = json.load(f)
+        index = leer_indice(INDEX_PATH, mmap=RAG_INDICE_MMAP)
+        if "almacen" in metadatos_json:
+            ruta_almacen = os.path.join(os.path.dirname(METADATA_PATH), metadatos_json["almacen"])
+            chunks = AlmacenChunks(ruta_almacen, metadatos_json["documentos"])
+        else:
+            chunks = metadatos_json.get("chunks", [])
+        total = metadatos_json.get("total", len(chunks)) # Metadatos antiguos: la lista de chunks es la referencia
+        # Una actualización que sólo elimina documentos no cambia los totales: la generación sí
+        # (sin generación en ninguno de los dos lados, índice anterior a las generaciones, sólo se comparan los totales)
+        misma_generacion = "almacen" not in metadatos_json or chunks.generacion == metadatos_json.get("generacion")
+        if misma_generacion and index.ntotal == total and len(chunks) == total:
+            return index, chunks, metadatos_json
+        time.sleep(espera)
+    raise RuntimeError(
+        f"El índice ({index.ntotal} vectores), el almacén ({len(chunks)} chunks) y los metadatos ({total}) "
+        "no corresponden a la misma construcción: reconstruir el índice con build_rag_index.py"
+    )
+
+def _cargar_indice():
+    # Lee el índice FAISS generado previamente (mapeado en memoria, compartido entre procesos) y los metadatos.
+    # El texto de los chunks está en el almacén binario mapeado (sólo se decodifican los chunks recuperados);
+    # los metadatos de índices antiguos traen los chunks como lista en el propio JSON
+    print("📚 Cargando índice RAG...")
+    index, chunks, metadatos_json = _leer_archivos_indice()
+    eliminados = metadatos_json.get("eliminados", 0) # Chunks borrados (None) por build_rag_index.py incremental
+    # Tipo de índice, métrica y parámetros de búsqueda con los que se construyó (índices antiguos: plano L2).
+    # nprobe / efSearch se pueden ajustar sin reconstruir el índice con RAG_NPROBE / RAG_EF_SEARCH
+    config_indice = metadatos_json.get("indice", {"tipo": "flat", "metrica": "l2"})
+    if os.environ.get("RAG_NPROBE"):
+        config_indice["nprobe"] = int(os.environ["RAG_NPROBE"])
+    if os.environ.get("RAG_EF_SEARCH"):
+        config_indice["ef_search"] = int(os.environ["RAG_EF_SEARCH"])
+    configurar_busqueda(index, config_indice)
+    print(f"✅ Índice ({config_indice['tipo']}, {config_indice['metrica']}) y metadatos cargados ({len(chunks) - eliminados} chunks)")
+
+    # Caché RAG: la versión del índice (fecha de modificación de sus archivos) invalida las respuestas
+    # guardadas si se reconstruye; el backend se agrega al nombre de los modelos porque los embeddings
+    # y las respuestas de los modelos cuantizados no son idénticos a los originales
+    version_indice = f"{os.stat(INDEX_PATH).st_mtime_ns}-{os.stat(METADATA_PATH).st_mtime_ns}"
+    sufijo = "" if RAG_BACKEND == "torch" else f"@{RAG_BACKEND}"
+    cache = CacheRAG(
+        EMBED_MODEL + sufijo, QA_MODEL + sufijo, version_indice,
+        max_embeddings=RAG_CACHE_EMBEDDINGS_MAX,
+        max_respuestas=RAG_CACHE_RESPUESTAS_MAX,
+        ruta_sqlite=RAG_CACHE_SQLITE or None
+    )
+    return SimpleNamespace(index=index, chunks=chunks, eliminados=eliminados, config=config_indice, cache=cache)
+
+embedding_model = CargaPerezosa("embeddings", _cargar_embeddings)
+qa_pipeline = CargaPerezosa("qa", _cargar_qa)
+indice_rag = CargaPerezosa("indice_rag", _cargar_indice)
+# Subsistemas del RAG, para precargarlos o informar su estado (/readyz)
+SUBSISTEMAS = {carga.nombre: carga for carga in (embedding_model, qa_pipeline, indice_rag)}
+
+def precargar():
+    """Carga en segundo plano el índice y los modelos, para que la primera pregunta no espere su carga"""
+    return [carga.precargar() for carga in SUBSISTEMAS.values()]
+
+def estadisticas_cache():
+    """Estadísticas de la caché RAG (None si el índice todavía no se cargó)"""
+    return indice_rag.obtener().cache.estadisticas() if indice_rag.cargado else None
 
 # ========================
 # FUNCIONES RAG
 # ========================
+def embeddings_preguntas(preguntas):
+    """
+    Embeddings de una lista de preguntas ya normalizadas: las que están en caché se reutilizan
+    y las demás se codifican juntas en una sola llamada a encode
+    """
+    cache_rag = indice_rag.obtener().cache
+    embeddings = [cache_rag.obtener_embedding(p) for p in preguntas]
+    pendientes = [i for i, emb in enumerate(embeddings) if emb is None]
+    if pendientes:
+        modelo = embedding_model.obtener()
+        with metricas.medir(metricas.etapas_rag, etapa="encode"):
+            nuevos = modelo.encode([preguntas[i] for i in pendientes], batch_size=max(len(pendientes), 1))
+        for i, emb in zip(pendientes, nuevos):
+            cache_rag.guardar_embedding(preguntas[i], emb)
+            embeddings[i] = emb
+    return np.asarray(embeddings, dtype=np.float32)
+
+def recuperar_indices_lote(preguntas, k=3):
+    """Recupera los ids de los k chunks más relevantes de cada pregunta con una única búsqueda FAISS"""
+    rag = indice_rag.obtener()
+    # Índice vacío (se eliminaron todos los documentos): no hay chunks que recuperar
+    # (FAISS no admite buscar con k = 0) y cada pregunta se responde sin contexto
+    if rag.index.ntotal == 0:
+        return [[] for _ in preguntas]
+    # Convierte las preguntas en vectores de embeddings
+    # (con producto interno se normalizan igual que los vectores del índice)
+    preguntas_emb = embeddings_preguntas([normalizar_pregunta(p) for p in preguntas])
+    preguntas_emb = preparar_vectores(preguntas_emb, rag.config["metrica"])
+     # Busca los k más cercanos de todas las preguntas a la vez en el índice FAISS.
+    # Los chunks de documentos eliminados o modificados quedan como None tras una actualización incremental:
+    # se piden más vecinos (el doble cada vez) hasta tener k chunks vigentes por pregunta
+    k_busqueda = k
+    while True:
+        with metricas.medir(metricas.etapas_rag, etapa="busqueda"):
+            _, indices = rag.index.search(preguntas_emb, min(k_busqueda, rag.index.ntotal))
+        filas = [[int(i) for i in fila if 0 <= i < len(rag.chunks) and rag.chunks[i] is not None][:k] for fila in indices]
+        if rag.eliminados == 0 or k_busqueda >= rag.index.ntotal or all(len(fila) == k for fila in filas):
+            return filas
+        k_busqueda *= 2
+
+def recuperar_indices(pregunta, k=3):
+    """Recupera los ids de los k chunks más relevantes usando embeddings + FAISS"""
+    return recuperar_indices_lote([pregunta], k)[0]
+
 def recuperar_contexto(pregunta, k=3):
     """Recupera los k chunks más relevantes usando embeddings + FAISS"""
-    # Convierte la pregunta en vector de embeddings
-    pregunta_emb = embedding_model.encode(pregunta)
-     # Busca los k más cercanos en el índice FAISS
-    _, indices = index.search(np.array([pregunta_emb]), k)
     # Recupera el texto original de cada índice encontrado
-    contextos = [chunks[i] for i in indices[0] if 0 <= i < len(chunks)]
+    chunks = indice_rag.obtener().chunks
+    contextos = [chunks[i] for i in recuperar_indices(pregunta, k)]
     return "\n\n".join(contextos)
 
+def responder_preguntas(preguntas):
+    """
+    Versión por lotes de responder_pregunta: un encode, una búsqueda FAISS y una llamada
+    al pipeline de QA para todas las preguntas que no tengan ya la respuesta en caché
+    """
+    rag = indice_rag.obtener()
+    preguntas = [normalizar_pregunta(p) for p in preguntas]
+    ids_por_pregunta = recuperar_indices_lote(preguntas)
+    respuestas = [None] * len(preguntas)
+    pendientes, entradas = [], []
+    for i, (pregunta, ids_chunks) in enumerate(zip(preguntas, ids_por_pregunta)):
+        contexto = "\n\n".join(rag.chunks[j] for j in ids_chunks)
+        if not contexto.strip():
+            respuestas[i] = "⚠️ No encontré contexto relevante en los documentos."
+            continue
+        # Si la misma pregunta ya se respondió con los mismos chunks, se reutiliza la respuesta
+        respuestas[i] = rag.cache.obtener_respuesta(pregunta, ids_chunks)
+        if respuestas[i] is None:
+            pendientes.append(i)
+            entradas.append({"question": pregunta, "context": contexto})
+
+    if entradas:
+        # Pasa las preguntas y sus contextos al modelo de QA extractivo en un solo lote
+        qa = qa_pipeline.obtener()
+        with metricas.medir(metricas.etapas_rag, etapa="qa"):
+            resultados = qa(entradas, batch_size=len(entradas))
+        if isinstance(resultados, dict):
+            resultados = [resultados] # Con una sola entrada el pipeline devuelve un dict
+        for i, resultado in zip(pendientes, resultados):
+            respuestas[i] = resultado["answer"]
+            rag.cache.guardar_respuesta(preguntas[i], ids_por_pregunta[i], respuestas[i])
+    return respuestas
+
+# Planificador que agrupa las preguntas concurrentes de distintos hilos en un mismo lote
+# (su hilo de fondo se crea con la primera pregunta)
+microlotes_rag = CargaPerezosa(
+    "microlotes_rag",
+    lambda: Microlotes(responder_preguntas, RAG_MICROLOTE_VENTANA_MS, RAG_MICROLOTE_MAX, nombre="microlotes-rag")
+)
+
 def responder_pregunta(pregunta):
     """
     Usa el pipeline de QA (extractivo) para responder
     """
-    contexto = recuperar_contexto(pregunta)
-    if not contexto.strip():
-        return "⚠️ No encontré contexto relevante en los documentos."
-    # Pasa la pregunta y el contexto al modelo de QA extractivo
-    resultado = qa_pipeline({
-        "question": pregunta,
-        "context": contexto
-    })
-
-    return resultado["answer"]
+    if RAG_MICROLOTE_VENTANA_MS > 0:
+        return microlotes_rag.obtener().enviar(pregunta)
+    return responder_preguntas([pregunta])[0]
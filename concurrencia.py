@@ -0,0 +1,72 @@
+# ===============================
+# Límites de concurrencia por ruta
+# ===============================
+# Waitress atiende todas las rutas con el mismo pool de hilos: si las preguntas RAG (BERT en CPU, lentas)
+# ocupan todos los hilos, las predicciones (rápidas) quedan esperando. Con un límite por ruta y un ejecutor
+# acotado para el RAG, el exceso de peticiones se rechaza enseguida (429) en lugar de acumularse,
+# y siempre quedan hilos libres para /predict.
+
+# Importo las librerías necesarias
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Saturado(Exception):
+    """No hay capacidad para aceptar la petición (se responde 429)"""
+
+
+class LimiteConcurrencia:
+    def __init__(self, maximo):
+        # Peticiones simultáneas admitidas (0 = sin límite)
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self.en_curso = 0
+        self.rechazos = 0
+
+    def intentar(self):
+        """Ocupa un lugar si hay capacidad (sin esperar); devuelve False si está saturado"""
+        with self._lock:
+            if self.maximo > 0 and self.en_curso >= self.maximo:
+                self.rechazos += 1
+                return False
+            self.en_curso += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.en_curso -= 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {"maximo": self.maximo or None, "en_curso": self.en_curso, "rechazos": self.rechazos}
+
+
+class EjecutorAcotado:
+    """Pool de hilos dedicado con cola acotada: admite hasta trabajadores + max_cola tareas pendientes"""
+
+    def __init__(self, nombre, trabajadores, max_cola):
+        self.trabajadores = trabajadores
+        self.max_cola = max_cola
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix=nombre)
+        self._limite = LimiteConcurrencia(trabajadores + max_cola)
+
+    def enviar(self, funcion, *args):
+        """Encola la tarea y devuelve su Future; lanza Saturado si la cola está llena"""
+        if not self._limite.intentar():
+            raise Saturado()
+        try:
+            futuro = self._pool.submit(funcion, *args)
+        except Exception:
+            self._limite.liberar()
+            raise
+        futuro.add_done_callback(lambda _: self._limite.liberar())
+        return futuro
+
+    def estadisticas(self):
+        estadisticas = self._limite.estadisticas()
+        return {
+            "trabajadores": self.trabajadores,
+            "max_cola": self.max_cola,
+            "pendientes": estadisticas["en_curso"],
+            "rechazos": estadisticas["rechazos"],
+        }
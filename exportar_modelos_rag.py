@@ -0,0 +1,77 @@
+import os
+import argparse
+from chat_rag_local import EMBED_MODEL, QA_MODEL, RAG_MODELOS_ONNX, ARCHIVOS_ONNX
+
+# ============================
+# CONFIG
+# ============================
+# Exporta offline los modelos del RAG (embeddings y QA) a ONNX y genera además su versión con cuantización
+# dinámica a int8 (pesos en int8, activaciones cuantizadas en cada inferencia: no necesita datos de calibración).
+# chat_rag_local.py los usa con RAG_BACKEND=onnx o RAG_BACKEND=onnx-int8:
+#     <destino>/embeddings/onnx/model.onnx, <destino>/embeddings/onnx/model_quantized.onnx
+#     <destino>/qa/model.onnx, <destino>/qa/model_quantized.onnx
+# Requiere optimum y onnxruntime (pip install "optimum[onnxruntime]"). Las instrucciones de CPU de la
+# cuantización (--cuantizacion) deben corresponder a los servidores donde se ejecutará el modelo.
+CUANTIZACIONES = ("arm64", "avx2", "avx512", "avx512_vnni")
+SUFIJO_INT8 = "quantized" # model.onnx -> model_quantized.onnx
+
+# ============================
+# FUNCIONES
+# ============================
+def exportar_embeddings(modelo, destino, cuantizacion):
+    """Exporta el SentenceTransformer a ONNX (con su tokenizer y pooling) y lo cuantiza a int8"""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    print(f"🔍 Exportando modelo de embeddings {modelo} a ONNX...")
+    # Con backend="onnx" sentence_transformers exporta el modelo de PyTorch al cargarlo
+    embeddings = SentenceTransformer(modelo, backend="onnx", device="cpu")
+    embeddings.save(destino)
+    print(f"🗜️ Cuantizando a int8 ({cuantizacion})...")
+    export_dynamic_quantized_onnx_model(embeddings, cuantizacion, destino, file_suffix=SUFIJO_INT8)
+
+
+def exportar_qa(modelo, destino, cuantizacion):
+    """Exporta el modelo de QA extractivo a ONNX con optimum y lo cuantiza a int8"""
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    print(f"🤖 Exportando modelo de QA {modelo} a ONNX...")
+    qa = ORTModelForQuestionAnswering.from_pretrained(modelo, export=True)
+    qa.save_pretrained(destino)
+    AutoTokenizer.from_pretrained(modelo).save_pretrained(destino)
+    print(f"🗜️ Cuantizando a int8 ({cuantizacion})...")
+    configuracion = getattr(AutoQuantizationConfig, cuantizacion)(is_static=False)
+    ORTQuantizer.from_pretrained(qa).quantize(configuracion, save_dir=destino, file_suffix=SUFIJO_INT8)
+
+
+def tamano_mb(ruta):
+    return round(os.path.getsize(ruta) / 2**20, 1) if os.path.exists(ruta) else None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exporta los modelos del RAG a ONNX y a ONNX cuantizado int8")
+    parser.add_argument("--destino", default=RAG_MODELOS_ONNX, help="Carpeta de salida (RAG_MODELOS_ONNX)")
+    parser.add_argument("--cuantizacion", choices=CUANTIZACIONES, default="avx2",
+                        help="Instrucciones de CPU para las que se cuantiza (avx512_vnni en Xeon recientes)")
+    parser.add_argument("--solo", choices=("embeddings", "qa"), default=None, help="Exporta sólo uno de los modelos")
+    parser.add_argument("--modelo-embeddings", default=EMBED_MODEL)
+    parser.add_argument("--modelo-qa", default=QA_MODEL)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.solo in (None, "embeddings"):
+        exportar_embeddings(args.modelo_embeddings, os.path.join(args.destino, "embeddings"), args.cuantizacion)
+    if args.solo in (None, "qa"):
+        exportar_qa(args.modelo_qa, os.path.join(args.destino, "qa"), args.cuantizacion)
+
+    # Tamaño de cada archivo exportado (el int8 ocupa aproximadamente la cuarta parte)
+    for modelo, subcarpeta in (("embeddings", "onnx"), ("qa", "")):
+        for backend, archivo in ARCHIVOS_ONNX.items():
+            mb = tamano_mb(os.path.join(args.destino, modelo, subcarpeta, archivo))
+            if mb is not None:
+                print(f"✅ {modelo} ({backend}): {mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,14 @@
 
 
 # Importo las librerías necesarias
+import logging
+import numpy as np
 import pandas as pd
+from scipy import sparse as sp
 from sklearn.base import BaseEstimator, TransformerMixin
+from onehot_transformer import BloquesDispersos
+
+logger = logging.getLogger(__name__)
 
 class FeatureSelector(BaseEstimator, TransformerMixin):
     def __init__(self, selected_features):
@@ -19,15 +25,23 @@ class FeatureSelector(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        print("➡️ Columnas recibidas en X (shape):", X.shape)
-        print("➡️ Número de features seleccionadas:", len(self.feature_names))
+        # Sólo con el nivel de log en DEBUG (antes eran print en cada llamada, un costo de stdout en cada predicción)
+        logger.debug("➡️ Columnas recibidas en X (shape): %s", X.shape)
+        logger.debug("➡️ Número de features seleccionadas: %d", len(self.feature_names))
+
+        # Modo disperso: se une el bloque numérico al one-hot en CSR y se seleccionan las columnas
+        # por índices enteros precalculados, sin densificar la matriz
+        if isinstance(X, BloquesDispersos):
+            indices = self._indices_columnas(X.columnas)
+            matriz = sp.hstack([sp.csr_matrix(X.numericas), X.onehot], format="csr")
+            return matriz[:, indices]
 
         # Si no es DataFrame, intento convertir
         if not isinstance(X, pd.DataFrame):
             try:
                 # Si no lo es (ej., una sparse matrix), intenta convertirlo a DataFrame
                 X = pd.DataFrame(X.toarray(), columns=self.feature_names)
-                print("✅ Se reconstruyó el DataFrame desde matriz dispersa.")
+                logger.debug("✅ Se reconstruyó el DataFrame desde matriz dispersa.")
             except Exception as e:
                 # Si falla la reconstrucción, da un mensaje de error explícito
                 raise ValueError(
@@ -45,3 +59,17 @@ class FeatureSelector(BaseEstimator, TransformerMixin):
                 f"Columnas faltantes: {set(self.feature_names) - set(X.columns)}"
             ) from e
 
+    def _indices_columnas(self, columnas):
+        """Índices de self.feature_names dentro de 'columnas', calculados una vez por cada disposición de columnas"""
+        cache = self.__dict__.setdefault("_cache_indices", {})
+        clave = tuple(columnas)
+        if clave not in cache:
+            posicion = {nombre: i for i, nombre in enumerate(columnas)}
+            faltantes = set(self.feature_names) - posicion.keys()
+            if faltantes:
+                raise ValueError(
+                    f"❌ Algunas columnas de self.feature_names no están presentes en X.\n"
+                    f"Columnas faltantes: {faltantes}"
+                )
+            cache[clave] = np.array([posicion[nombre] for nombre in self.feature_names], dtype=np.intp)
+        return cache[clave]
@@ -0,0 +1,130 @@
+# ===============================
+# Fragmentación (chunking) por tokens y límites de oración
+# ===============================
+# Reemplaza el corte cada 700 caracteres de smart_chunk: el texto extraído del PDF se normaliza (espacios,
+# cortes de línea y guiones de fin de línea, líneas de puntos de los índices), se divide en párrafos y oraciones
+# y las oraciones se agrupan en chunks cuyo tamaño se mide en tokens del tokenizer del modelo de embeddings,
+# de modo que ningún chunk supere lo que el modelo realmente codifica (el resto se trunca y se pierde).
+
+# Importo las librerías necesarias
+import re
+import unicodedata
+from collections import Counter
+
+# Palabra cortada con guion al final de una línea ("transfor-\nmación")
+_GUION_CORTE = re.compile(r"(\w)-[^\S\n]*\n\s*(\w)")
+# Líneas de puntos de los índices ("Introducción ........ 7")
+_PUNTOS_GUIA = re.compile(r"(?:\.\s?){4,}")
+_ESPACIOS = re.compile(r"\s+")
+# Fin de oración: signo de cierre seguido de espacio y de un comienzo de oración (mayúscula, número, apertura)
+_FIN_ORACION = re.compile(r"(?<=[.!?…:;])\s+(?=[¿¡\"“'(\[●•▪\-–A-ZÁÉÍÓÚÜÑ0-9])")
+# Viñetas: cada una empieza un párrafo nuevo
+_VINETA = re.compile(r"\s+(?=[●•▪])")
+
+
+def parrafos(texto):
+    """
+    Normaliza el texto extraído de un PDF y lo devuelve como lista de párrafos (con espacios simples).
+    El extractor separa las palabras con una cantidad de saltos de línea que depende del PDF (en algunos
+    "\\n \\n" entre cada palabra): la separación más frecuente se toma como simple espacio y sólo
+    las separaciones con más saltos de línea que esa se consideran cambio de párrafo.
+    """
+    texto = unicodedata.normalize("NFKC", texto).replace("\r", "\n")
+    texto = _GUION_CORTE.sub(r"\1\2", texto)
+    texto = _PUNTOS_GUIA.sub(" ", texto)
+    saltos = Counter(m.group().count("\n") for m in _ESPACIOS.finditer(texto))
+    habitual = saltos.most_common(1)[0][0] if saltos else 0
+    separador_parrafo = re.compile(r"[^\S\n]*(?:\n[^\S\n]*){%d,}\s*" % max(habitual + 1, 2))
+    resultado = []
+    for parrafo in separador_parrafo.split(texto):
+        for parte in _VINETA.split(parrafo):
+            parte = " ".join(parte.split())
+            if parte:
+                resultado.append(parte)
+    return resultado
+
+
+def normalizar_texto(texto):
+    """Texto normalizado: un párrafo por línea, espacios simples"""
+    return "\n".join(parrafos(texto))
+
+
+def oraciones(parrafo):
+    return [o for o in _FIN_ORACION.split(parrafo) if o]
+
+
+def contador_tokens(tokenizer):
+    """Función que cuenta los tokens (sin los especiales [CLS]/[SEP]) de una lista de textos en una sola llamada"""
+    def contar(textos):
+        if not textos:
+            return []
+        return [len(ids) for ids in tokenizer(list(textos), add_special_tokens=False)["input_ids"]]
+    return contar
+
+
+def _partir_oracion(oracion, tokens, contar, max_tokens):
+    """Divide por palabras (en mitades) una oración que por sí sola supera max_tokens"""
+    palabras = oracion.split()
+    if tokens <= max_tokens or len(palabras) < 2:
+        return [(oracion, tokens)]
+    mitad = len(palabras) // 2
+    izquierda, derecha = " ".join(palabras[:mitad]), " ".join(palabras[mitad:])
+    tokens_izq, tokens_der = contar([izquierda, derecha])
+    return (_partir_oracion(izquierda, tokens_izq, contar, max_tokens)
+            + _partir_oracion(derecha, tokens_der, contar, max_tokens))
+
+
+def fragmentar_paginas(paginas, contar, max_tokens=126, solapamiento_tokens=24):
+    """
+    Divide el texto de las páginas en chunks de hasta max_tokens tokens sin cortar oraciones.
+    Un párrafo nuevo empieza un chunk nuevo si el actual ya tiene al menos la mitad de max_tokens;
+    dentro de un párrafo, las últimas oraciones del chunk anterior (hasta solapamiento_tokens) se repiten
+    al comienzo del siguiente para no perder contexto. Devuelve los chunks y la página (1..n) donde empieza cada uno.
+    """
+    # Unidades: (oración, página, empieza párrafo); los tokens se cuentan todos juntos en una llamada
+    unidades = [
+        (oracion, numero, j == 0)
+        for numero, pagina in enumerate(paginas, start=1)
+        for parrafo in parrafos(pagina)
+        for j, oracion in enumerate(oraciones(parrafo))
+    ]
+    tokens = contar([u[0] for u in unidades])
+
+    chunks, paginas_chunk = [], []
+    actual, tokens_actual = [], 0 # actual: lista de (oración, tokens, página, empieza párrafo)
+
+    def cerrar():
+        # Las oraciones se unen con un espacio y los párrafos con un salto de línea
+        partes = []
+        for oracion, _, _, empieza_parrafo in actual:
+            if partes:
+                partes.append("\n" if empieza_parrafo else " ")
+            partes.append(oracion)
+        chunks.append("".join(partes))
+        paginas_chunk.append(actual[0][2])
+
+    for (oracion, pagina, nuevo_parrafo), n in zip(unidades, tokens):
+        for parte, n_parte in _partir_oracion(oracion, n, contar, max_tokens):
+            cambio_parrafo = nuevo_parrafo and tokens_actual >= max_tokens // 2
+            if actual and (tokens_actual + n_parte > max_tokens or cambio_parrafo):
+                cerrar()
+                # Solapamiento: sólo dentro del mismo párrafo y si cabe junto a la oración nueva
+                arrastre, tokens_arrastre = [], 0
+                if not nuevo_parrafo:
+                    for unidad in reversed(actual):
+                        if tokens_arrastre + unidad[1] > min(solapamiento_tokens, max_tokens - n_parte):
+                            break
+                        arrastre.insert(0, unidad)
+                        tokens_arrastre += unidad[1]
+                actual, tokens_actual = arrastre, tokens_arrastre
+            actual.append((parte, n_parte, pagina, nuevo_parrafo))
+            tokens_actual += n_parte
+            nuevo_parrafo = False
+    if actual:
+        cerrar()
+    return chunks, paginas_chunk
+
+
+def fragmentar(texto, contar, max_tokens=126, solapamiento_tokens=24):
+    """Versión para un texto sin páginas: devuelve sólo la lista de chunks"""
+    return fragmentar_paginas([texto], contar, max_tokens, solapamiento_tokens)[0]
@@ -0,0 +1,143 @@
+# ===============================
+# Tipos de índice FAISS para el sistema RAG
+# ===============================
+# Construcción del índice (plano, IVF, IVF-PQ, PQ o HNSW, con distancia L2 o producto interno sobre vectores normalizados)
+# y configuración de sus parámetros de búsqueda (nprobe / efSearch). La configuración usada se guarda en los metadatos
+# del índice para que chat_rag_local.py lo abra con los mismos parámetros con los que se construyó.
+
+# Importo las librerías necesarias
+import math
+import faiss
+import numpy as np
+
+TIPOS_INDICE = ("flat", "ivf", "ivfpq", "pq", "hnsw")
+METRICAS = ("l2", "ip")
+TIPOS_ENTRENADOS = ("ivf", "ivfpq", "pq") # Tipos que se entrenan con los vectores del corpus
+VECTORES_POR_CENTROIDE = 39 # k-means necesita al menos ~39 vectores por centroide
+FACTOR_REENTRENAMIENTO = 4 # Se reentrena si el corpus supera este múltiplo de los vectores del entrenamiento
+
+# Configuración por defecto: índice plano L2 (búsqueda exacta, como el índice original)
+CONFIG_POR_DEFECTO = {
+    "tipo": "flat",
+    "metrica": "l2",
+    "nlist": 100, # IVF: cantidad de listas (centroides)
+    "nprobe": 8, # IVF: listas visitadas en cada búsqueda
+    "pq_m": 16, # PQ: subcuantizadores (debe dividir la dimensión)
+    "pq_bits": 8, # PQ: bits por subcuantizador
+    "hnsw_m": 32, # HNSW: vecinos por nodo
+    "ef_construction": 200, # HNSW: amplitud de búsqueda al construir
+    "ef_search": 64, # HNSW: amplitud de búsqueda al consultar
+}
+
+
+def preparar_vectores(vectores, metrica):
+    """Convierte a float32 contiguo y, con producto interno, normaliza a norma 1 (similitud coseno)"""
+    vectores = np.ascontiguousarray(vectores, dtype=np.float32)
+    if metrica == "ip":
+        vectores = vectores.copy()
+        faiss.normalize_L2(vectores)
+    return vectores
+
+
+def construir_indice(vectores, **opciones):
+    """
+    Construye, entrena (si el tipo lo requiere) y llena un índice FAISS con los vectores.
+    Devuelve (índice, config), donde config son los parámetros efectivamente usados, que deben
+    guardarse junto al índice. Los parámetros de entrenamiento se ajustan si hay pocos vectores
+    y, sin ningún vector, los tipos que requieren entrenamiento (ivf, ivfpq, pq) se construyen como plano.
+    """
+    config = {**CONFIG_POR_DEFECTO, **{k: v for k, v in opciones.items() if v is not None}}
+    if config["tipo"] not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice desconocido: {config['tipo']} (opciones: {', '.join(TIPOS_INDICE)})")
+    if config["metrica"] not in METRICAS:
+        raise ValueError(f"Métrica desconocida: {config['metrica']} (opciones: {', '.join(METRICAS)})")
+
+    vectores = preparar_vectores(vectores, config["metrica"])
+    n, d = vectores.shape
+    config["dimension"] = d
+    metrica = faiss.METRIC_INNER_PRODUCT if config["metrica"] == "ip" else faiss.METRIC_L2
+    tipo = config["tipo"]
+
+    # Sin vectores no se puede entrenar (k-means / PQ fallan con un error poco claro de FAISS): índice plano,
+    # que no necesita entrenamiento; al reconstruir con más documentos se usa el tipo pedido
+    if n == 0 and tipo in TIPOS_ENTRENADOS:
+        config["tipo_solicitado"] = tipo
+        config["tipo"] = tipo = "flat"
+
+    # Ajustes para corpus pequeños: k-means necesita al menos ~39 vectores por centroide
+    # y el PQ al menos 2**bits vectores para entrenar sus códigos
+    if tipo in ("ivf", "ivfpq"):
+        config["nlist"] = max(1, min(config["nlist"], n // VECTORES_POR_CENTROIDE))
+        config["nprobe"] = min(config["nprobe"], config["nlist"])
+    if tipo in ("ivfpq", "pq"):
+        if d % config["pq_m"] != 0:
+            raise ValueError(f"pq_m={config['pq_m']} debe dividir la dimensión de los vectores ({d})")
+        config["pq_bits"] = max(1, min(config["pq_bits"], int(math.log2(max(n, 2)))))
+    if tipo in TIPOS_ENTRENADOS:
+        # Vectores con los que se entrenan los centroides / códigos (ver motivo_reentrenamiento)
+        config["entrenado_con"] = n
+
+    if tipo == "flat":
+        indice = faiss.IndexFlat(d, metrica)
+    elif tipo == "ivf":
+        indice = faiss.IndexIVFFlat(faiss.IndexFlat(d, metrica), d, config["nlist"], metrica)
+    elif tipo == "ivfpq":
+        indice = faiss.IndexIVFPQ(faiss.IndexFlat(d, metrica), d, config["nlist"], config["pq_m"], config["pq_bits"], metrica)
+    elif tipo == "pq":
+        indice = faiss.IndexPQ(d, config["pq_m"], config["pq_bits"], metrica)
+    else:
+        indice = faiss.IndexHNSWFlat(d, config["hnsw_m"], metrica)
+        indice.hnsw.efConstruction = config["ef_construction"]
+
+    if not indice.is_trained:
+        indice.train(vectores)
+    indice.add(vectores)
+    configurar_busqueda(indice, config)
+    return indice, config
+
+
+def motivo_reentrenamiento(config, n, **opciones):
+    """
+    Indica si un índice ya construido (config, la de sus metadatos) debe reentrenarse en lugar de recibir
+    más vectores: al agregar vectores a un IVF o PQ los centroides y los códigos quedan los del primer
+    entrenamiento, y con un corpus pequeño nlist / pq_bits se redujeron. Devuelve el motivo, o None si el índice
+    sigue sirviendo para n vectores vigentes con los parámetros pedidos (opciones, como en construir_indice)
+    """
+    if config.get("tipo") not in TIPOS_ENTRENADOS:
+        return None
+    pedida = {**CONFIG_POR_DEFECTO, **{k: v for k, v in opciones.items() if v is not None}}
+    entrenado_con = config.get("entrenado_con")
+    if entrenado_con is None:
+        return "índice sin el tamaño de su entrenamiento en los metadatos"
+    if n > FACTOR_REENTRENAMIENTO * max(entrenado_con, 1):
+        return f"el corpus creció de {entrenado_con} a {n} chunks desde el entrenamiento"
+    if config["tipo"] in ("ivf", "ivfpq") and config["nlist"] < pedida["nlist"] <= n // VECTORES_POR_CENTROIDE:
+        return f"ya hay vectores para entrenar nlist={pedida['nlist']} (se entrenó con nlist={config['nlist']})"
+    if config["tipo"] in ("ivfpq", "pq") and config["pq_bits"] < pedida["pq_bits"] <= math.log2(max(n, 2)):
+        return f"ya hay vectores para entrenar pq_bits={pedida['pq_bits']} (se entrenó con pq_bits={config['pq_bits']})"
+    return None
+
+
+def configurar_busqueda(indice, config):
+    """Aplica al índice los parámetros de búsqueda guardados (nprobe para IVF, efSearch para HNSW)"""
+    tipo = config.get("tipo", "flat")
+    if tipo in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(indice).nprobe = int(config["nprobe"])
+    elif tipo == "hnsw":
+        indice.hnsw.efSearch = int(config["ef_search"])
+    return indice
+
+
+def leer_indice(ruta, mmap=True):
+    """
+    Lee el índice FAISS. Con mmap=True se mapea el archivo en memoria (IO_FLAG_MMAP): los procesos que
+    abren el mismo índice comparten sus páginas en lugar de tener cada uno una copia privada.
+    Si la versión de FAISS o el tipo de índice no lo admiten, se lee de forma normal.
+    """
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) # IFC: también los códigos de índices planos
+        try:
+            return faiss.read_index(ruta, flags)
+        except RuntimeError:
+            pass
+    return faiss.read_index(ruta)
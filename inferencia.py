@@ -0,0 +1,214 @@
+# ===============================
+# Validación e inferencia compartidas
+# ===============================
+# Este módulo concentra la validación de los registros recibidos y la ejecución del pipeline entrenado,
+# para que la ruta /predict, la ruta por lotes y cualquier otro punto de entrada usen el mismo camino.
+
+# Importo las librerías necesarias
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Umbral de decisión: un registro se clasifica como positivo si su probabilidad es mayor o igual al umbral
+UMBRAL_DECISION = float(os.environ.get("UMBRAL_DECISION", 0.5))
+
+# --- Variables numéricas y requeridas ---
+# Se definen los nombres de las variables que deben ser numéricas
+numeric_vars = {
+    "age", "duration", "campaign", "pdays", "previous",
+    "emp.var.rate", "cons.price.idx", "cons.conf.idx", "euribor3m", "nr.employed"
+}
+# Conjunto de variables que se esperan obligatoriamente para hacer la predicción
+variables_requeridas = {
+    "age", "job", "marital", "education", "default", "housing", "loan", "contact",
+    "month", "day_of_week", "duration", "campaign", "pdays", "previous", "poutcome",
+    "emp.var.rate", "cons.price.idx", "cons.conf.idx", "euribor3m", "nr.employed"
+}
+
+
+def validar_registro(datos):
+    """
+    Valida un registro y convierte sus variables numéricas a float.
+    Devuelve (registro, None) si es válido o (None, mensaje_de_error) si no lo es.
+    """
+    # Verifica que se haya recibido un objeto JSON no vacío
+    if not isinstance(datos, dict) or not datos:
+        return None, "No se enviaron datos JSON válidos."
+
+    # Verifica si faltan variables obligatorias
+    faltantes = variables_requeridas - datos.keys()
+    if faltantes:
+        return None, f"Faltan variables obligatorias: {', '.join(sorted(faltantes))}"
+
+    # Convierte las variables numéricas a float (sobre una copia, sin modificar la entrada)
+    registro = dict(datos)
+    for var in numeric_vars:
+        try:
+            registro[var] = float(registro[var])
+        except (TypeError, ValueError):
+            return None, f"La variable '{var}' debe ser numérica."
+    return registro, None
+
+
+def clave_registro(registro):
+    """
+    Hash canónico de un registro ya validado (con las variables numéricas convertidas a float),
+    de modo que el mismo perfil enviado con otro orden de claves o como texto ("35" / 35) dé la misma clave.
+    """
+    canonico = json.dumps(registro, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonico.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def inferir(modelo, df, umbral=UMBRAL_DECISION):
+    """
+    Camino de inferencia compartido: ejecuta el pipeline una sola vez (predict_proba)
+    y obtiene la clase a partir de la probabilidad de la clase positiva y del umbral de decisión.
+    Devuelve (clases, probabilidades) como arrays de NumPy.
+    """
+    probabilidades = _predict_proba(modelo, df)[:, 1]
+    clases = np.where(probabilidades >= umbral, modelo.classes_[1], modelo.classes_[0])
+    return clases, probabilidades
+
+
+def _predict_proba(modelo, X):
+    """
+    predict_proba del modelo. Con las métricas activas el pipeline se recorre paso a paso
+    (lo mismo que hace Pipeline.predict_proba) para registrar la duración de cada etapa
+    """
+    if not metricas.ACTIVAS:
+        return modelo.predict_proba(X)
+    pasos = getattr(modelo, "steps", None)
+    if pasos is None:
+        # Plan de fila u otro estimador sin pasos: se mide como una única etapa
+        with metricas.medir(metricas.etapas_pipeline, etapa=type(modelo).__name__):
+            return modelo.predict_proba(X)
+    for _, paso in pasos[:-1]:
+        if paso is None or paso == "passthrough":
+            continue
+        with metricas.medir(metricas.etapas_pipeline, etapa=type(paso).__name__):
+            X = paso.transform(X)
+    estimador = pasos[-1][1]
+    with metricas.medir(metricas.etapas_pipeline, etapa=type(estimador).__name__):
+        return estimador.predict_proba(X)
+
+
+_recurso_plan_avisado = False # Si ya se avisó (WARNING) de que el plan de fila recurrió al pipeline de pandas
+
+
+def inferir_registro(modelo, registro, plan=None, umbral=UMBRAL_DECISION):
+    """
+    Puntúa un único registro validado y devuelve (clase, probabilidad).
+    Si hay un plan de fila (PlanFila) se usa el camino sin pandas; ante cualquier caso que el plan
+    no contemple se recurre al pipeline completo, que es la referencia.
+    """
+    global _recurso_plan_avisado
+    if plan is not None:
+        try:
+            clases, probabilidades = inferir(plan, [registro], umbral)
+            return int(clases[0]), float(probabilidades[0])
+        except Exception:
+            # Un error sistemático del plan mandaría todas las predicciones al camino lento: el primero se registra
+            # como WARNING (los siguientes en DEBUG) y todos se cuentan en /metrics (plan_fila_recursos_total)
+            metricas.recursos_plan_fila.incrementar()
+            nivel = logging.DEBUG if _recurso_plan_avisado else logging.WARNING
+            _recurso_plan_avisado = True
+            logger.log(nivel, "El plan de fila no pudo puntuar el registro, se usa el pipeline de pandas", exc_info=True)
+    clases, probabilidades = inferir(modelo, pd.DataFrame([registro]), umbral)
+    return int(clases[0]), float(probabilidades[0])
+
+
+def predecir_lote(modelo, registros, umbral=UMBRAL_DECISION):
+    """
+    Valida una lista de registros y puntúa todos los válidos con una única pasada por el pipeline.
+    Devuelve una lista de resultados (uno por registro, en el mismo orden) con la predicción
+    y la probabilidad, o con el error correspondiente a ese registro.
+    """
+    resultados = [None] * len(registros)
+    validos, posiciones = [], []
+    for i, datos in enumerate(registros):
+        registro, error = validar_registro(datos)
+        if error:
+            resultados[i] = {"indice": i, "error": error}
+        else:
+            validos.append(registro)
+            posiciones.append(i)
+
+    if validos:
+        try:
+            # Un único DataFrame para todo el lote: el pipeline se ejecuta una sola vez
+            puntuados = _puntuar(modelo, pd.DataFrame(validos), umbral)
+        except Exception:
+            # Si el lote completo falla, se puntúa registro a registro para aislar los que provocan el error
+            puntuados = []
+            for registro in validos:
+                try:
+                    puntuados.append(_puntuar(modelo, pd.DataFrame([registro]), umbral)[0])
+                except Exception:
+                    puntuados.append(None)
+
+        for i, puntuado in zip(posiciones, puntuados):
+            if puntuado is None:
+                resultados[i] = {"indice": i, "error": "Error al procesar la predicción. Verifique los datos enviados."}
+            else:
+                prediccion, probabilidad = puntuado
+                resultados[i] = {"indice": i, "prediccion": prediccion, "probabilidad": round(probabilidad, 4)}
+    return resultados
+
+
+def _puntuar(modelo, df, umbral):
+    """Puntúa un DataFrame y devuelve una lista de (clase, probabilidad de la clase positiva)"""
+    clases, probabilidades = inferir(modelo, df, umbral)
+    return [(int(c), float(p)) for c, p in zip(clases, probabilidades)]
+
+
+def validar_dataframe(df):
+    """
+    Versión vectorizada de validar_registro para puntuación masiva (CSV/Parquet).
+    Devuelve (df_convertido, errores): el DataFrame con las variables numéricas convertidas a float
+    y un array con el mensaje de error de cada fila (None si la fila es válida).
+    Si faltan columnas obligatorias se lanza ValueError, porque afecta a todas las filas.
+    """
+    faltantes = variables_requeridas - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan variables obligatorias: {', '.join(sorted(faltantes))}")
+
+    df = df.copy(deep=False)
+    errores = np.full(len(df), None, dtype=object)
+    sin_error = np.ones(len(df), dtype=bool)
+    for var in numeric_vars:
+        convertida = pd.to_numeric(df[var], errors="coerce").astype(float)
+        # Se marca el primer error de cada fila, como en validar_registro (valores no numéricos o vacíos)
+        invalidas = convertida.isna().to_numpy() & sin_error
+        errores[invalidas] = f"La variable '{var}' debe ser numérica."
+        sin_error &= ~invalidas
+        df[var] = convertida
+    return df, errores
+
+
+def puntuar_dataframe(modelo, df, umbral=UMBRAL_DECISION):
+    """
+    Valida y puntúa un bloque de registros con una única pasada por el pipeline.
+    Devuelve (clases, probabilidades, errores) alineados con las filas de df; las filas con error
+    tienen clase y probabilidad vacías. Si el bloque completo falla se puntúa fila a fila para aislar los errores.
+    """
+    df, errores = validar_dataframe(df)
+    clases = np.full(len(df), None, dtype=object)
+    probabilidades = np.full(len(df), np.nan)
+    validas = np.flatnonzero(pd.isna(errores))
+    if len(validas):
+        try:
+            clases[validas], probabilidades[validas] = inferir(modelo, df.iloc[validas], umbral)
+        except Exception:
+            for i in validas:
+                try:
+                    clase, probabilidad = inferir(modelo, df.iloc[[i]], umbral)
+                    clases[i], probabilidades[i] = clase[0], probabilidad[0]
+                except Exception:
+                    errores[i] = "Error al procesar la predicción. Verifique los datos enviados."
+    return clases, probabilidades, errores
@@ -7,6 +7,8 @@
 # Importo las librerías necesarias.
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import MinMaxScaler
+import numpy as np
+from onehot_transformer import BloquesDispersos
 
 
 class ManualScaler(BaseEstimator, TransformerMixin):
@@ -22,7 +24,27 @@ class ManualScaler(BaseEstimator, TransformerMixin):
         return self # Retorna self para integrarse en pipelines
 
     def transform(self, X):
-        X = X.copy()
+        if isinstance(X, BloquesDispersos):
+            return self._transform_disperso(X)
+        # Copia superficial: las columnas escaladas se reemplazan por arrays nuevos,
+        # así que el DataFrame de entrada no se modifica y el resto de columnas no se duplica
+        X = X.copy(deep=False)
         # Aplica el escalado Min-Max sobre las columnas numéricas
         X[self.numeric_cols] = self.scaler.transform(X[self.numeric_cols])
-        return X # Retorno el DataFrame transformado
\ No newline at end of file
+        return X # Retorno el DataFrame transformado
+
+    def _transform_disperso(self, X):
+        """Escala las columnas numéricas del bloque denso de BloquesDispersos (el bloque one-hot no se toca)"""
+        faltantes = set(self.numeric_cols) - set(X.columnas_numericas)
+        if faltantes:
+            raise ValueError(f"Columnas numéricas ausentes en el bloque denso: {faltantes}")
+        posiciones = [X.columnas_numericas.index(col) for col in self.numeric_cols]
+        numericas = X.numericas.copy()
+        # Mismas operaciones que MinMaxScaler.transform: X * scale_ + min_ (y recorte si clip=True)
+        valores = numericas[:, posiciones]
+        valores *= self.scaler.scale_
+        valores += self.scaler.min_
+        if getattr(self.scaler, "clip", False):
+            np.clip(valores, self.scaler.feature_range[0], self.scaler.feature_range[1], out=valores)
+        numericas[:, posiciones] = valores
+        return X.reemplazar_numericas(numericas)
@@ -0,0 +1,124 @@
+# ===============================
+# Métricas de latencia (formato Prometheus)
+# ===============================
+# Histogramas y contadores en memoria, seguros entre hilos, expuestos en /metrics con el formato de texto
+# de Prometheus. Miden cada etapa del pipeline (preprocesamiento, one-hot, escalado, selección y estimador),
+# cada fase del RAG (embeddings, búsqueda FAISS, QA) y las peticiones HTTP por ruta.
+# Con METRICAS=0 las mediciones de etapas se desactivan y el pipeline vuelve a ejecutarse en una sola llamada.
+
+# Importo las librerías necesarias
+import os
+import time
+import bisect
+import threading
+import contextlib
+
+ACTIVAS = os.environ.get("METRICAS", "1") != "0"
+
+# Límites de los buckets en segundos (de 0,5 ms a 10 s)
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRO = []
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores, extra=""):
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _REGISTRO.append(self)
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = tuple(etiquetas[n] for n in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for clave, valor in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._series = {} # etiquetas -> [conteos por bucket (el último es +Inf), suma, cantidad]
+        self._lock = threading.Lock()
+        _REGISTRO.append(self)
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(etiquetas[n] for n in self.etiquetas)
+        posicion = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for clave, (conteos, suma, cantidad) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, conteo in zip(self.limites + ("+Inf",), conteos):
+                    acumulado += conteo
+                    etiquetas = _etiquetas(self.etiquetas, clave, 'le="%s"' % limite)
+                    lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {cantidad}")
+        return lineas
+
+
+@contextlib.contextmanager
+def medir(histograma, **etiquetas):
+    """Mide la duración del bloque y la registra en el histograma (no hace nada si las métricas están desactivadas)"""
+    if not ACTIVAS:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+def exponer():
+    """Todas las métricas registradas en el formato de texto de Prometheus"""
+    lineas = []
+    for metrica in _REGISTRO:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+# Métricas de la aplicación
+etapas_pipeline = Histograma(
+    "pipeline_etapa_segundos", "Duración de cada etapa del pipeline de predicción", ("etapa",)
+)
+etapas_rag = Histograma(
+    "rag_etapa_segundos", "Duración de cada fase del RAG (encode, busqueda, qa)", ("etapa",)
+)
+peticiones = Contador("http_peticiones_total", "Peticiones HTTP atendidas por ruta y código", ("ruta", "codigo"))
+duracion_peticiones = Histograma("http_peticion_segundos", "Duración de las peticiones HTTP por ruta", ("ruta",))
+recursos_plan_fila = Contador(
+    "plan_fila_recursos_total", "Predicciones que el plan de fila no pudo puntuar y pasaron al pipeline de pandas"
+)
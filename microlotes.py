@@ -0,0 +1,63 @@
+# ===============================
+# Planificador de micro-lotes
+# ===============================
+# Agrupa las llamadas concurrentes (una por hilo de Waitress) en lotes: un hilo de fondo junta los elementos
+# que llegan durante una ventana corta (o hasta un tamaño máximo de lote), ejecuta una sola llamada por lotes
+# y devuelve a cada llamador su resultado. La ventana acota la latencia extra que añade la espera.
+
+# Importo las librerías necesarias
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class Microlotes:
+    def __init__(self, funcion_lote, ventana_ms=10, max_lote=8, nombre="microlotes"):
+        # funcion_lote recibe una lista de elementos y devuelve una lista de resultados en el mismo orden
+        self.funcion_lote = funcion_lote
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def enviar(self, elemento, timeout=None):
+        """Encola un elemento y bloquea hasta que su lote se procese; devuelve su resultado (o relanza su error)"""
+        futuro = Future()
+        self._cola.put((elemento, futuro))
+        return futuro.result(timeout)
+
+    def _bucle(self):
+        while True:
+            # Espera el primer elemento y junta los que lleguen dentro de la ventana, hasta max_lote
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.ventana
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._procesar(lote)
+
+    def _procesar(self, lote):
+        elementos = [elemento for elemento, _ in lote]
+        try:
+            resultados = self.funcion_lote(elementos)
+        except Exception:
+            # Si el lote falla, se reprocesa elemento a elemento para que un error no afecte a los demás
+            logger.warning("Falló un micro-lote de %d elementos, se procesan por separado", len(lote), exc_info=True)
+            for elemento, futuro in lote:
+                try:
+                    futuro.set_result(self.funcion_lote([elemento])[0])
+                except Exception as e:
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            futuro.set_result(resultado)
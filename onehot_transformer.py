@@ -5,15 +5,44 @@
 
 
 #Importo las librerías necesarias.
+import copy
 from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
+from scipy import sparse as sp
+import numpy as np
 import pandas as pd
 
+
+# Salida del modo disperso: las columnas numéricas quedan en un bloque denso (pocas columnas)
+# y el one-hot en una matriz CSR, cada bloque con sus nombres de columna para los pasos siguientes del pipeline
+class BloquesDispersos:
+    def __init__(self, numericas, columnas_numericas, onehot, columnas_onehot):
+        self.numericas = numericas # ndarray (n_filas, n_numéricas)
+        self.columnas_numericas = list(columnas_numericas)
+        self.onehot = onehot # matriz CSR (n_filas, n_categorías)
+        self.columnas_onehot = list(columnas_onehot)
+
+    @property
+    def columnas(self):
+        return self.columnas_numericas + self.columnas_onehot
+
+    @property
+    def shape(self):
+        return (self.onehot.shape[0], len(self.columnas_numericas) + len(self.columnas_onehot))
+
+    def reemplazar_numericas(self, numericas):
+        """Devuelve unos bloques nuevos con otro bloque numérico (el bloque one-hot se comparte, no se copia)"""
+        return BloquesDispersos(numericas, self.columnas_numericas, self.onehot, self.columnas_onehot)
+
+
 # Clase personalizada para codificación One-Hot
 class OneHotEncoderTransformer(BaseEstimator, TransformerMixin):
-    def __init__(self, categorical_cols):
+    def __init__(self, categorical_cols, sparse=False):
         # Lista de columnas categóricas a codificar
         self.categorical_cols = categorical_cols
+        # Modo disperso: devuelve BloquesDispersos (one-hot en CSR) en lugar de un DataFrame denso
+        self.sparse = sparse
         # Inicializo el codificador OneHotEncoder (devuelve matriz densa y evita errores con categorías desconocidas)
         self.encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
 
@@ -27,17 +56,91 @@ class OneHotEncoderTransformer(BaseEstimator, TransformerMixin):
         self.feature_names_out = self.encoder.get_feature_names_out(self.categorical_cols)
         return self # Retorna self para cumplir con la interfaz de scikit-learn
 
+    def __setstate__(self, state):
+        # Los pipelines guardados antes de existir el modo disperso no tienen el atributo 'sparse'
+        state.setdefault("sparse", False)
+        super().__setstate__(state)
+
 
     def transform(self, X):
-        X = X.copy()
+        if self.sparse:
+            return self._transform_disperso(X)
         # Selecciona y convierte las columnas categóricas a string
         X_cat = X[self.categorical_cols].astype(str)
         # Aplica la transformación One-Hot
         encoded = self.encoder.transform(X_cat)
         # Convierte el resultado a DataFrame con los nombres de las columnas codificadas
         df_encoded = pd.DataFrame(encoded, columns=self.feature_names_out, index=X.index)
-        # Elimina las columnas categóricas originales del DataFrame
-        X.drop(columns=self.categorical_cols, inplace=True)
+        # Elimina las columnas categóricas originales (drop devuelve un DataFrame nuevo, sin copiar antes la entrada)
+        X = X.drop(columns=self.categorical_cols)
         # Concatena las nuevas columnas codificadas con el resto del DataFrame
         X = pd.concat([X, df_encoded], axis=1)
-        return X # Retorno el DataFrame transformado
\ No newline at end of file
+        return X # Retorno el DataFrame transformado
+
+    def _transform_disperso(self, X):
+        """
+        Codifica las columnas categóricas directamente en una matriz CSR a partir de las categorías ajustadas,
+        sin pasar por la matriz densa. Las columnas numéricas restantes forman el bloque denso.
+        """
+        if self.encoder.drop_idx_ is not None or getattr(self.encoder, "_infrequent_enabled", False):
+            raise ValueError("El modo disperso no soporta OneHotEncoder con 'drop' ni categorías infrecuentes.")
+        filas, columnas = [], []
+        desplazamiento = 0
+        for col, categorias in zip(self.categorical_cols, self.encoder.categories_):
+            # Código de categoría de cada fila (-1 para categorías desconocidas, que se ignoran como en handle_unknown='ignore')
+            codigos = pd.Categorical(X[col].astype(str), categories=categorias).codes
+            conocidas = np.flatnonzero(codigos >= 0)
+            filas.append(conocidas)
+            columnas.append(codigos[conocidas].astype(np.int64) + desplazamiento)
+            desplazamiento += len(categorias)
+        filas, columnas = np.concatenate(filas), np.concatenate(columnas)
+        onehot = sp.csr_matrix((np.ones(len(filas)), (filas, columnas)), shape=(len(X), desplazamiento))
+
+        # Sólo las columnas numéricas pueden formar parte de la matriz de features
+        restantes = X.drop(columns=self.categorical_cols).select_dtypes(include=["number", "bool"])
+        return BloquesDispersos(restantes.to_numpy(dtype=float), restantes.columns, onehot, self.feature_names_out)
+
+
+def estimador_sin_nombres(estimador, columnas):
+    """
+    El estimador final se entrenó con un DataFrame (con nombres de columnas) y aquí recibe un array o una matriz
+    dispersa: se comprueba una sola vez que el orden de las columnas coincide con el del entrenamiento y se devuelve
+    una copia superficial sin feature_names_in_ (comparte los coeficientes), para que sklearn no advierta en cada predicción
+    """
+    nombres_entrenamiento = getattr(estimador, "feature_names_in_", None)
+    if nombres_entrenamiento is None:
+        return estimador
+    if list(nombres_entrenamiento) != list(columnas):
+        raise ValueError("Las columnas de FeatureSelector no coinciden con las del entrenamiento del estimador.")
+    copia = copy.copy(estimador)
+    del copia.feature_names_in_
+    return copia
+
+
+def pipeline_disperso(pipeline):
+    """
+    Devuelve un pipeline equivalente con el one-hot en modo disperso. Los pasos ya ajustados se comparten
+    (sólo se copian superficialmente el OneHotEncoderTransformer y el estimador final, que recibe la matriz CSR
+    sin nombres de columnas). Lanza ValueError si el pipeline no admite el modo disperso, p. ej. si el estimador
+    final no acepta matrices dispersas (se prueba con una fila)
+    """
+    *pasos, (nombre_estimador, estimador) = pipeline.steps
+    # La matriz CSR la arma el paso anterior al estimador (FeatureSelector), con sus columnas en este orden
+    columnas = getattr(pasos[-1][1], "feature_names", None) if pasos else None
+    if columnas is None:
+        raise ValueError("El modo disperso requiere un FeatureSelector inmediatamente antes del estimador.")
+    dispersos = []
+    for nombre, paso in pasos:
+        if isinstance(paso, OneHotEncoderTransformer):
+            encoder = paso.encoder
+            if encoder.drop_idx_ is not None or getattr(encoder, "_infrequent_enabled", False):
+                raise ValueError("El modo disperso no soporta OneHotEncoder con 'drop' ni categorías infrecuentes.")
+            paso = copy.copy(paso)
+            paso.sparse = True
+        dispersos.append((nombre, paso))
+    estimador = estimador_sin_nombres(estimador, columnas)
+    try:
+        estimador.predict_proba(sp.csr_matrix((1, len(columnas))))
+    except Exception as e:
+        raise ValueError(f"El estimador final ({type(estimador).__name__}) no acepta matrices dispersas: {e}") from e
+    return Pipeline(dispersos + [(nombre_estimador, estimador)])
@@ -0,0 +1,113 @@
+# ===============================
+# Plan compilado para puntuar un único registro sin pandas
+# ===============================
+# A partir del pipeline ya entrenado (PreprocessingTransformer -> OneHotEncoderTransformer / ManualScaler -> FeatureSelector -> modelo)
+# se precalcula, para cada feature que usa el modelo, de dónde sale su valor y en qué posición del vector va.
+# Así un registro JSON validado se convierte directamente en el vector de features con NumPy,
+# sin construir DataFrames de una fila ni copiarlos en cada paso del pipeline.
+
+# Importo las librerías necesarias
+import numpy as np
+from preprocessing import PreprocessingTransformer
+from onehot_transformer import OneHotEncoderTransformer, estimador_sin_nombres
+from manual_scaler import ManualScaler
+from feature_selector import FeatureSelector
+
+
+class PlanFila:
+    def __init__(self, pipeline):
+        # Separa los transformadores del estimador final y valida que la estructura sea la esperada
+        pasos = [paso for _, paso in pipeline.steps]
+        *transformadores, self.estimador = pasos
+        tipos = [type(paso) for paso in transformadores]
+        if (len(tipos) != 4 or tipos[0] is not PreprocessingTransformer or tipos[-1] is not FeatureSelector
+                or set(tipos[1:3]) != {OneHotEncoderTransformer, ManualScaler}):
+            raise ValueError(f"Estructura de pipeline no soportada por el plan de fila: {[t.__name__ for t in tipos]}")
+        self.preprocesamiento = transformadores[0]
+        onehot = next(p for p in transformadores if isinstance(p, OneHotEncoderTransformer))
+        escalador = next(p for p in transformadores if isinstance(p, ManualScaler))
+        selector = transformadores[-1]
+
+        encoder = onehot.encoder
+        if encoder.drop_idx_ is not None or getattr(encoder, "_infrequent_enabled", False):
+            raise ValueError("El plan de fila no soporta OneHotEncoder con 'drop' ni categorías infrecuentes.")
+        categoricas = list(onehot.categorical_cols)
+        if set(categoricas) & set(escalador.numeric_cols):
+            raise ValueError("Hay columnas que son a la vez categóricas y numéricas escaladas.")
+
+        # Posición final de cada feature en el vector que recibe el modelo (orden de FeatureSelector)
+        self.columnas = list(selector.feature_names)
+        posicion = {nombre: i for i, nombre in enumerate(self.columnas)}
+        self.n_features = len(self.columnas)
+
+        # One-hot: para cada columna categórica, categoría (como texto) -> posición en el vector.
+        # Sólo se guardan las categorías cuyas columnas codificadas fueron seleccionadas.
+        nombres_onehot = list(onehot.feature_names_out)
+        self._onehot = []
+        desplazamiento = 0
+        for col, categorias in zip(categoricas, encoder.categories_):
+            mapa = {}
+            for j, categoria in enumerate(categorias):
+                nombre = nombres_onehot[desplazamiento + j]
+                if nombre in posicion:
+                    mapa[str(categoria)] = posicion[nombre]
+            desplazamiento += len(categorias)
+            self._onehot.append((col, mapa))
+        salidas_onehot = set(nombres_onehot)
+
+        # Features que se copian del registro preprocesado (numéricas, escaladas o no)
+        self._directas = []
+        for nombre, i in posicion.items():
+            if nombre in salidas_onehot:
+                continue
+            if nombre in categoricas:
+                raise ValueError(f"La feature '{nombre}' es una columna categórica eliminada por el one-hot.")
+            self._directas.append((nombre, i))
+
+        # Escalado Min-Max: posiciones del vector y parámetros (scale_, min_) del escalador ya ajustado
+        scaler = escalador.scaler
+        indices_escalador = {col: k for k, col in enumerate(escalador.numeric_cols)}
+        escaladas = [(i, indices_escalador[nombre]) for nombre, i in self._directas if nombre in indices_escalador]
+        self._pos_escaladas = np.array([i for i, _ in escaladas], dtype=np.intp)
+        self._escala = scaler.scale_[[k for _, k in escaladas]]
+        self._minimo = scaler.min_[[k for _, k in escaladas]]
+        self._clip = scaler.feature_range if getattr(scaler, "clip", False) else None
+        # Columnas que el escalador necesita aunque no se seleccionen (en pandas su ausencia produce un error)
+        self._requeridas = list(escalador.numeric_cols)
+
+        # El estimador recibe el vector como array: copia sin feature_names_in_ (sklearn no advierte en cada predicción)
+        self._estimador_array = estimador_sin_nombres(self.estimador, self.columnas)
+
+    @property
+    def classes_(self):
+        return self.estimador.classes_
+
+    def vectorizar(self, registro):
+        """Convierte un registro validado (diccionario) en el vector de features que recibe el modelo"""
+        X = self.preprocesamiento.transformar_registro(registro)
+        faltantes = [col for col in self._requeridas if col not in X]
+        if faltantes:
+            raise KeyError(f"Faltan columnas para el escalado: {faltantes}")
+
+        vector = np.zeros(self.n_features)
+        # One-hot: se activa la posición de la categoría (las desconocidas se ignoran, como handle_unknown='ignore')
+        for col, mapa in self._onehot:
+            i = mapa.get(str(X[col]))
+            if i is not None:
+                vector[i] = 1.0
+        # Valores directos y escalado Min-Max con las mismas operaciones que MinMaxScaler.transform
+        for nombre, i in self._directas:
+            vector[i] = float(X[nombre])
+        if len(self._pos_escaladas):
+            valores = vector[self._pos_escaladas]
+            valores *= self._escala
+            valores += self._minimo
+            if self._clip is not None:
+                np.clip(valores, self._clip[0], self._clip[1], out=valores)
+            vector[self._pos_escaladas] = valores
+        return vector
+
+    def predict_proba(self, registros):
+        """Calcula las probabilidades de una lista de registros (misma interfaz que el pipeline, sin pandas)"""
+        matriz = np.vstack([self.vectorizar(registro) for registro in registros])
+        return self._estimador_array.predict_proba(matriz)
@@ -5,9 +5,49 @@
 # Aplica las reglas manuales, binning, agrupaciones y crea las nuevas variables como en el Notebook.
 
 #Importo las librerías necesarias
+import bisect
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
+# ==== Tablas de reglas (compartidas por transform y transformar_registro) ====
+# Reemplazo de valores de texto por números (orden cronológico)
+MESES = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+DIAS_SEMANA = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MAPA_MESES = {mes: i for i, mes in enumerate(MESES, start=1)}
+MAPA_DIAS_SEMANA = {dia: i for i, dia in enumerate(DIAS_SEMANA, start=1)}
+
+# Intervalos y etiquetas del binning de edad
+BINS_EDAD = [0, 25, 40, 60, 140]
+ETIQUETAS_EDAD = ['young', 'lower middle aged', 'middle aged', 'senior']
+
+# Agrupa tipos de trabajo en categorías más amplias
+JOB_MAP = {
+    'admin.': 'White-collar', 'management': 'White-collar', 'technician': 'White-collar',
+    'blue-collar': 'Blue-collar', 'services': 'Blue-collar', 'housemaid': 'Blue-collar',
+    'entrepreneur': 'Self-employed', 'self-employed': 'Self-employed',
+    'retired': 'Non-active', 'student': 'Non-active', 'unemployed': 'Non-active',
+    'unknown': 'Other'
+}
+
+# Reglas de imputación como tablas de búsqueda
+# 'education' desconocida según el trabajo
+IMPUTACION_EDUCACION_POR_JOB = {
+    'management': 'university.degree', 'services': 'high.school', 'housemaid': 'basic.4y'
+}
+# 'job' desconocido según la educación
+IMPUTACION_JOB_POR_EDUCACION = {
+    'basic.4y': 'blue-collar', 'basic.6y': 'blue-collar', 'basic.9y': 'blue-collar',
+    'professional.course': 'technician'
+}
+
+# Agrupa niveles educativos en categorías más amplias
+EDUCATION_MAP = {
+    'basic.9y': 'Basic', 'basic.4y': 'Basic', 'basic.6y': 'Basic',
+    'high.school': 'Middle', 'professional.course': 'Middle',
+    'university.degree': 'Superior', 'unknown': 'Other', 'illiterate': 'Other'
+}
+
 
 # Clase personalizada compatible con scikit-learn
 class PreprocessingTransformer(BaseEstimator, TransformerMixin):
@@ -15,68 +55,126 @@ class PreprocessingTransformer(BaseEstimator, TransformerMixin):
         return self
     # Método transform: aplica todas las transformaciones al dataset
     def transform(self, X):
-        X = X.copy()
+        # 'nr.employed' es altamente correlacionada con otras variables y fue descartada en el modelo.
+        # drop devuelve un DataFrame nuevo, así que reemplaza a la copia inicial (el DataFrame de entrada no se modifica)
+        X = X.drop(columns=['nr.employed'])
 
-        # Reglas personalizadas para imputación
+        # Reglas personalizadas para imputación, vectorizadas y en el mismo orden que en el Notebook
         # Corrige valores 'unknown' en función de otras columnas
-        X.loc[(X['age'] > 60) & (X['job'] == 'unknown'), 'job'] = 'retired'
-        X.loc[(X['education'] == 'unknown') & (X['job'] == 'management'), 'education'] = 'university.degree'
-        X.loc[(X['education'] == 'unknown') & (X['job'] == 'services'), 'education'] = 'high.school'
-        X.loc[(X['education'] == 'unknown') & (X['job'] == 'housemaid'), 'education'] = 'basic.4y'
+        job = X['job'].mask((X['age'] > 60) & (X['job'] == 'unknown'), 'retired')
+        educacion_imputada = job.map(IMPUTACION_EDUCACION_POR_JOB)
+        education = X['education'].mask((X['education'] == 'unknown') & educacion_imputada.notna(), educacion_imputada)
         # Reglas cruzadas para asignar 'job' en base a 'education'
-        X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.4y'), 'job'] = 'blue-collar'
-        X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.6y'), 'job'] = 'blue-collar'
-        X.loc[(X['job'] == 'unknown') & (X['education'] == 'basic.9y'), 'job'] = 'blue-collar'
-        X.loc[(X['job'] == 'unknown') & (X['education'] == 'professional.course'), 'job'] = 'technician'
+        job_imputado = education.map(IMPUTACION_JOB_POR_EDUCACION)
+        job = job.mask((job == 'unknown') & job_imputado.notna(), job_imputado)
+        X['job'] = job
+        X['education'] = education
 
         # ==== Limpieza de valores especiales ====
         # pdays = 999 significa "no contactado antes", lo pasamos a 0
-        X['pdays'] = X['pdays'].apply(lambda x: 0 if x == 999 else x)
+        X['pdays'] = X['pdays'].mask(X['pdays'] == 999, 0)
 
         # Reemplazo de valores de texto por números (orden cronológico)
-        X['month'].replace(
-            ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'),
-            range(1, 13), inplace=True)
-
-        X['day_of_week'].replace(
-            ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'),
-            range(1, 8), inplace=True)
+        X['month'] = _codificar_ordinal(X['month'], MAPA_MESES)
+        X['day_of_week'] = _codificar_ordinal(X['day_of_week'], MAPA_DIAS_SEMANA)
 
        # Binning de edad
        # Crea la variable categórica 'age_binned' a partir de intervalos
-        bins = [0, 25, 40, 60, 140]
-        labels = ['young', 'lower middle aged', 'middle aged', 'senior']
-        X['age_binned'] = pd.cut(X['age'], bins=bins, labels=labels, right=True, include_lowest=True)
+        X['age_binned'] = pd.cut(X['age'], bins=BINS_EDAD, labels=ETIQUETAS_EDAD, right=True, include_lowest=True)
 
         # Agrupamientos
-        # Agrupa tipos de trabajo en categorías más amplias
-        job_map = {
-            'admin.': 'White-collar', 'management': 'White-collar', 'technician': 'White-collar',
-            'blue-collar': 'Blue-collar', 'services': 'Blue-collar', 'housemaid': 'Blue-collar',
-            'entrepreneur': 'Self-employed', 'self-employed': 'Self-employed',
-            'retired': 'Non-active', 'student': 'Non-active', 'unemployed': 'Non-active',
-            'unknown': 'Other'
-        }
-        X['job_grouped'] = X['job'].map(job_map)
-
-        # Agrupa niveles educativos en categorías más amplias
-        education_map = {
-            'basic.9y': 'Basic', 'basic.4y': 'Basic', 'basic.6y': 'Basic',
-            'high.school': 'Middle', 'professional.course': 'Middle',
-            'university.degree': 'Superior', 'unknown': 'Other', 'illiterate': 'Other'
-        }
-        X['education_grouped'] = X['education'].map(education_map)
+        # Agrupa tipos de trabajo y niveles educativos en categorías más amplias
+        X['job_grouped'] = job.map(JOB_MAP)
+        X['education_grouped'] = education.map(EDUCATION_MAP)
 
         # Nuevas variables combinadas
         # Variable binaria: si fue contactado previamente o no
         X['contacted_previously'] = (X['previous'] >= 1).astype(int)
         # Crea una combinación de edad binned y estado civil
-        X['life_stage'] = X['age_binned'].astype(str) + ' & ' + X['marital']
+        X['life_stage'] = _combinar(X['age_binned'].astype(str), X['marital'])
         # Crea una combinación de trabajo y educación (como proxy socioeconómico)
-        X['socio-economic'] = X['job'].astype(str) + ' & ' + X['education']
+        X['socio-economic'] = _combinar(job.astype(str), education)
+
+        return X # Retorna el DataFrame transformado
+
+    def transformar_registro(self, registro):
+        """
+        Aplica las mismas reglas que transform a un único registro (diccionario), sin construir un DataFrame.
+        Devuelve un diccionario nuevo con las mismas claves y valores que tendría la fila transformada
+        (los valores faltantes se representan con NaN, como en pandas).
+        """
+        X = dict(registro)
+        job, education = X['job'], X['education']
+
+        # Reglas personalizadas para imputación (en el mismo orden que transform)
+        if X['age'] > 60 and job == 'unknown':
+            job = 'retired'
+        if education == 'unknown' and job == 'management':
+            education = 'university.degree'
+        elif education == 'unknown' and job == 'services':
+            education = 'high.school'
+        elif education == 'unknown' and job == 'housemaid':
+            education = 'basic.4y'
+        if job == 'unknown' and education in ('basic.4y', 'basic.6y', 'basic.9y'):
+            job = 'blue-collar'
+        elif job == 'unknown' and education == 'professional.course':
+            job = 'technician'
+        X['job'], X['education'] = job, education
+
+        # Limpieza de valores especiales y codificación ordinal de mes y día
+        if X['pdays'] == 999:
+            X['pdays'] = 0
+        X['month'] = MAPA_MESES.get(X['month'], X['month'])
+        X['day_of_week'] = MAPA_DIAS_SEMANA.get(X['day_of_week'], X['day_of_week'])
+
+        # Binning de edad con la misma semántica que pd.cut(right=True, include_lowest=True)
+        X['age_binned'] = _binning_edad(X['age'])
+
+        # Agrupamientos
+        X['job_grouped'] = JOB_MAP.get(job, float('nan'))
+        X['education_grouped'] = EDUCATION_MAP.get(education, float('nan'))
+
+        # Nuevas variables combinadas
+        X['contacted_previously'] = int(X['previous'] >= 1)
+        X['life_stage'] = str(X['age_binned']) + ' & ' + X['marital']
+        X['socio-economic'] = str(job) + ' & ' + education
 
         # Drop columnas redundantes
-        # 'nr.employed' es altamente correlacionada con otras variables y fue descartada en el modelo
-        X.drop(columns=['nr.employed'], inplace=True)
+        del X['nr.employed']
+        return X
+
+
+def _binning_edad(edad):
+    """Devuelve la etiqueta del intervalo de edad o NaN si la edad queda fuera de los intervalos"""
+    if edad == BINS_EDAD[0]:
+        return ETIQUETAS_EDAD[0]
+    posicion = bisect.bisect_left(BINS_EDAD, edad)
+    if 1 <= posicion < len(BINS_EDAD):
+        return ETIQUETAS_EDAD[posicion - 1]
+    return float('nan')
+
+
+def _codificar_ordinal(serie, mapa):
+    """Reemplaza los valores de texto por su código (como replace): los valores que no están en el mapa se conservan"""
+    codigos = serie.map(mapa)
+    if codigos.notna().all():
+        return codigos
+    return serie.map(lambda valor: mapa.get(valor, valor))
+
 
-        return X # Retorna el DataFrame transformado
\ No newline at end of file
+def _combinar(izquierda, derecha):
+    """
+    Construye 'izquierda & derecha' fila a fila. Las dos columnas se factorizan (códigos de categoría)
+    y el texto sólo se concatena una vez por cada combinación distinta, no una vez por fila.
+    Si el valor de la derecha falta, el resultado es NaN (como en la suma de Series de texto de pandas).
+    """
+    codigos_izq, unicos_izq = pd.factorize(izquierda)
+    codigos_der, unicos_der = pd.factorize(derecha)
+    n = max(len(unicos_der), 1)
+    combinados = np.where(codigos_der >= 0, codigos_izq * n + codigos_der, -1)
+    unicos, inversa = np.unique(combinados, return_inverse=True)
+    textos = np.array(
+        [np.nan if c < 0 else unicos_izq[c // n] + ' & ' + unicos_der[c % n] for c in unicos],
+        dtype=object
+    )
+    return pd.Series(textos[inversa.ravel()], index=izquierda.index)
@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import pandas as pd
+from inferencia import puntuar_dataframe, UMBRAL_DECISION
+from onehot_transformer import pipeline_disperso
+
+# ============================
+# CONFIG
+# ============================
+# Puntuación masiva offline con el mismo pipeline que usa la API (/predict).
+# Lee el archivo de entrada por bloques de tamaño fijo, puntúa cada bloque y escribe los resultados a medida
+# que se generan, de modo que la memoria no depende del tamaño del archivo.
+#
+# Uso:
+#     python puntuar_lote.py clientes.csv resultados.csv --separador ";" --id-columna id_cliente
+#     python puntuar_lote.py clientes.parquet resultados.parquet --procesos 4
+MODELO_PATH = "pipeline_modelo_completo.pkl" # Pipeline entrenado (el mismo que carga app.py)
+TAMANO_BLOQUE = 50000 # Filas por bloque
+
+# Modelo cargado en cada proceso del pool (se inicializa una vez por proceso)
+_modelo_proceso = None
+
+
+# ============================
+# LECTURA POR BLOQUES
+# ============================
+def leer_bloques(ruta, tamano_bloque, separador=","):
+    """Genera DataFrames de como máximo tamano_bloque filas a partir de un CSV o un Parquet"""
+    if ruta.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta)
+        inicio = 0
+        for lote in archivo.iter_batches(batch_size=tamano_bloque):
+            # Índice global de fila, igual que en la lectura por bloques de read_csv
+            bloque = lote.to_pandas()
+            bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+            inicio += len(bloque)
+            yield bloque
+    else:
+        yield from pd.read_csv(ruta, sep=separador, chunksize=tamano_bloque)
+
+
+# ============================
+# PUNTUACIÓN
+# ============================
+def puntuar_bloque(modelo, bloque, umbral, id_columna=None):
+    """Puntúa un bloque y devuelve un DataFrame con la fila original, la predicción, la probabilidad y el error"""
+    clases, probabilidades, errores = puntuar_dataframe(modelo, bloque, umbral)
+    resultado = pd.DataFrame({"fila": bloque.index.to_numpy()}, index=bloque.index)
+    if id_columna:
+        resultado[id_columna] = bloque[id_columna].to_numpy()
+    resultado["prediccion"] = pd.array(clases, dtype="Int64")
+    resultado["probabilidad"] = probabilidades.round(4)
+    resultado["error"] = pd.array(errores, dtype="string")
+    return resultado
+
+
+def _inicializar_proceso(modelo_path, disperso):
+    """Carga el pipeline una vez en cada proceso del pool"""
+    global _modelo_proceso
+    _modelo_proceso = cargar_modelo(modelo_path, disperso)
+
+
+def _puntuar_bloque_en_proceso(bloque, umbral, id_columna):
+    return puntuar_bloque(_modelo_proceso, bloque, umbral, id_columna)
+
+
+def cargar_modelo(modelo_path, disperso=False):
+    modelo = joblib.load(modelo_path)
+    # En modo disperso el one-hot se mantiene como matriz CSR hasta el estimador
+    return pipeline_disperso(modelo) if disperso else modelo
+
+
+def puntuar_bloques(bloques, args):
+    """
+    Genera los resultados de cada bloque en el mismo orden de entrada.
+    Con --procesos > 1 los bloques se reparten en un pool de procesos, con un máximo de 2 bloques
+    en vuelo por proceso para que la memoria siga acotada.
+    """
+    if args.procesos <= 1:
+        modelo = cargar_modelo(args.modelo, args.disperso)
+        for bloque in bloques:
+            yield puntuar_bloque(modelo, bloque, args.umbral, args.id_columna)
+        return
+
+    with ProcessPoolExecutor(max_workers=args.procesos, initializer=_inicializar_proceso,
+                             initargs=(args.modelo, args.disperso)) as pool:
+        en_vuelo = deque()
+        for bloque in bloques:
+            en_vuelo.append(pool.submit(_puntuar_bloque_en_proceso, bloque, args.umbral, args.id_columna))
+            if len(en_vuelo) >= 2 * args.procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+# ============================
+# ESCRITURA
+# ============================
+def escribir_resultados(resultados, ruta, separador=","):
+    """Escribe los resultados a medida que llegan (CSV en modo append o Parquet por row groups). Devuelve las filas escritas"""
+    filas = 0
+    if ruta.lower().endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        escritor = None
+        try:
+            for resultado in resultados:
+                tabla = pa.Table.from_pandas(resultado, preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(ruta, tabla.schema)
+                escritor.write_table(tabla.cast(escritor.schema))
+                filas += len(resultado)
+        finally:
+            if escritor is not None:
+                escritor.close()
+    else:
+        for i, resultado in enumerate(resultados):
+            resultado.to_csv(ruta, sep=separador, index=False, header=(i == 0), mode="w" if i == 0 else "a")
+            filas += len(resultado)
+    return filas
+
+
+def memoria_pico_mb():
+    """Memoria residente pico (RSS) del proceso principal y de sus procesos hijos, en MB"""
+    try:
+        import resource
+    except ImportError:
+        return None, None  # No disponible en Windows
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    return propio, hijos
+
+
+# ============================
+# MAIN
+# ============================
+def main():
+    parser = argparse.ArgumentParser(description="Puntuación masiva de clientes por bloques (CSV o Parquet)")
+    parser.add_argument("entrada", help="Archivo .csv o .parquet con las variables requeridas")
+    parser.add_argument("salida", help="Archivo .csv o .parquet donde se escriben los resultados")
+    parser.add_argument("--modelo", default=MODELO_PATH)
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE)
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (1 = sin pool)")
+    parser.add_argument("--separador", default=",", help="Separador de los CSV (bank-additional-full usa ';')")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_DECISION)
+    parser.add_argument("--id-columna", default=None, help="Columna de la entrada que se copia a la salida")
+    parser.add_argument("--disperso", action="store_true", help="Mantiene el one-hot como matriz dispersa")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.entrada) == os.path.abspath(args.salida):
+        parser.error("La salida no puede ser el mismo archivo que la entrada.")
+
+    print(f"📄 Puntuando {args.entrada} en bloques de {args.tamano_bloque} filas ({args.procesos} proceso/s)...")
+    inicio = time.perf_counter()
+    bloques = leer_bloques(args.entrada, args.tamano_bloque, args.separador)
+    resultados = puntuar_bloques(bloques, args)
+    filas = escribir_resultados(resultados, args.salida, args.separador)
+    segundos = time.perf_counter() - inicio
+
+    propio, hijos = memoria_pico_mb()
+    print(f"✅ {filas} filas puntuadas en {segundos:.1f}s ({filas / segundos:.0f} filas/s) -> {args.salida}")
+    if propio is not None:
+        print(f"📈 RSS pico: {propio:.0f} MB (proceso principal), {hijos:.0f} MB (mayor proceso hijo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Tests del proyecto (se ejecutan desde la raíz del repositorio con `python -m pytest`)
@@ -0,0 +1,64 @@
+# ===============================
+# Paridad exacta del plan de fila con el pipeline de pandas
+# ===============================
+# PlanFila repite las mismas operaciones que los transformadores del pipeline (incluido el escalado Min-Max,
+# en el mismo orden que MinMaxScaler.transform), así que el vector de features y las probabilidades deben ser
+# idénticos, no sólo cercanos. Se usa un pipeline con la misma estructura que el modelo entrenado, ajustado
+# sobre datos sintéticos, y casos límite de las reglas de preprocesamiento.
+
+# Importo las librerías necesarias
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from plan_fila import PlanFila
+from benchmarks.bench_plan_fila import pipeline_sintetico, casos_limite
+from benchmarks.datos_sinteticos import generar_registros
+from benchmarks.medicion import silenciar_stdout
+
+
+@pytest.fixture(scope="module")
+def modelo():
+    with silenciar_stdout():
+        return pipeline_sintetico()
+
+
+@pytest.fixture(scope="module")
+def plan(modelo):
+    return PlanFila(modelo)
+
+
+@pytest.fixture(scope="module")
+def registros():
+    # Registros con otra semilla que la del ajuste, más los casos límite sobre varios registros base
+    registros = generar_registros(300, semilla=7)
+    return registros + [caso for base in registros[:5] for caso in casos_limite(base)]
+
+
+def transformar_pipeline(modelo, df):
+    """Aplica los transformadores del pipeline (todos los pasos salvo el estimador final)"""
+    for _, paso in modelo.steps[:-1]:
+        df = paso.transform(df)
+    return df
+
+
+def test_vector_de_features_identico(modelo, plan, registros):
+    for registro in registros:
+        with silenciar_stdout():
+            esperado = transformar_pipeline(modelo, pd.DataFrame([registro]))[plan.columnas].to_numpy(dtype=float)[0]
+        np.testing.assert_array_equal(plan.vectorizar(registro), esperado, err_msg=str(registro))
+
+
+def test_probabilidades_identicas(modelo, plan, registros):
+    for registro in registros:
+        with silenciar_stdout():
+            esperado = modelo.predict_proba(pd.DataFrame([registro]))
+        np.testing.assert_array_equal(plan.predict_proba([registro]), esperado, err_msg=str(registro))
+
+
+def test_plan_sin_advertencias(plan, registros):
+    # El estimador se entrenó con nombres de columnas: el plan no debe advertir en cada predicción
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for registro in registros[:50]:
+            plan.predict_proba([registro])